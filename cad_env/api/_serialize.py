@@ -0,0 +1,38 @@
+"""
+Сериализация ответов API через orjson
+"""
+
+from pathlib import PurePath
+from typing import Any
+
+import orjson
+
+# numpy массивы и скаляры кодируются orjson напрямую, без tolist()
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Сериализация типов, которые orjson не поддерживает напрямую"""
+    if hasattr(obj, "tolist"):
+        # numpy массивы с dtype=object и похожие типы
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Тип {type(obj).__name__} не сериализуется в JSON")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Сериализовать объект в JSON
+    
+    Args:
+        obj: Объект для сериализации
+        
+    Returns:
+        JSON в виде байтов
+    """
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
@@ -2,28 +2,117 @@
 REST API для CAD Environment
 """
 
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from typing import AsyncIterator, Dict, Any, Iterator, Optional, Type, TypeVar
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+import msgspec
 import logging
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
 from ..core import CADEnvironment
+from ._serialize import dumps
+from .responses import ORJSONResponse
 
 logger = logging.getLogger(__name__)
 
 
-class CommandRequest(BaseModel):
+class CommandRequest(msgspec.Struct):
     """Запрос на выполнение команды"""
     command: str
-    parameters: Optional[Dict[str, Any]] = {}
+    parameters: Dict[str, Any] = {}
 
 
-class DocumentRequest(BaseModel):
+class DocumentRequest(msgspec.Struct):
     """Запрос для работы с документами"""
     name: Optional[str] = None
     filepath: Optional[str] = None
 
 
+RequestT = TypeVar("RequestT")
+
+
+def parse_body(model: Type[RequestT]):
+    """
+    Зависимость FastAPI, декодирующая тело запроса через msgspec
+    
+    Args:
+        model: Тип msgspec.Struct для тела запроса
+        
+    Returns:
+        Асинхронная функция-зависимость
+    """
+    decoder = msgspec.json.Decoder(model)
+    
+    async def parse(request: Request) -> RequestT:
+        try:
+            return decoder.decode(await request.body())
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    return parse
+
+
+parse_document_request = parse_body(DocumentRequest)
+parse_command_request = parse_body(CommandRequest)
+
+
+def request_body_openapi(model: Type[msgspec.Struct]) -> Dict[str, Any]:
+    """
+    Описание тела запроса для OpenAPI
+    
+    Тело декодируется в parse_body, поэтому FastAPI не видит его схему сам.
+    
+    Args:
+        model: Тип msgspec.Struct для тела запроса
+        
+    Returns:
+        Значение openapi_extra для маршрута
+    """
+    # Схема встраивается целиком: ссылки "#/$defs/..." вне JSON Schema не разрешаются
+    _, components = msgspec.json.schema_components([model])
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": components[model.__name__]}}
+        }
+    }
+
+
+DOCUMENT_REQUEST_OPENAPI = request_body_openapi(DocumentRequest)
+COMMAND_REQUEST_OPENAPI = request_body_openapi(CommandRequest)
+
+# Размер фрагмента при потоковой отдаче истории
+HISTORY_CHUNK_SIZE = 64 * 1024
+
+
+async def stream_history(history: Iterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    Потоковая сериализация истории в JSON вида {"success": true, "history": [...]}
+    
+    Args:
+        history: Итератор операций
+        
+    Yields:
+        Фрагменты JSON
+    """
+    chunk = bytearray(b'{"success":true,"history":[')
+    for i, entry in enumerate(history):
+        if i:
+            chunk += b","
+        chunk += dumps(entry)
+        if len(chunk) >= HISTORY_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    
+    chunk += b"]}"
+    yield bytes(chunk)
+
+
 class CADAPI:
     """
     REST API для взаимодействия с CAD Environment
@@ -40,59 +129,70 @@ class CADAPI:
         self.app = FastAPI(
             title="CAD Environment API",
             description="API для обучения LLM и RL агентов работе с CAD",
-            version="0.1.0"
+            version="0.1.0",
+            default_response_class=ORJSONResponse
         )
+        self._setup_compression()
         self._setup_routes()
     
+    def _setup_compression(self):
+        """Настройка сжатия ответов"""
+        if BrotliMiddleware is not None:
+            # Brotli для клиентов, которые его поддерживают, иначе gzip
+            self.app.add_middleware(BrotliMiddleware, minimum_size=500, quality=4,
+                                    gzip_fallback=True)
+        else:
+            self.app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+    
     def _setup_routes(self):
         """Настройка маршрутов API"""
         
-        @self.app.get("/")
+        @self.app.get("/", response_model=None)
         async def root():
             """Корневой эндпоинт"""
-            return {
+            return ORJSONResponse({
                 "message": "CAD Environment API",
                 "version": "0.1.0",
                 "status": "active"
-            }
+            })
         
-        @self.app.get("/health")
+        @self.app.get("/health", response_model=None)
         async def health_check():
             """Проверка состояния"""
-            return {"status": "healthy", "environment": "ready"}
+            return ORJSONResponse({"status": "healthy", "environment": "ready"})
         
-        @self.app.post("/documents/create")
-        async def create_document(request: DocumentRequest):
+        @self.app.post("/documents/create", openapi_extra=DOCUMENT_REQUEST_OPENAPI)
+        async def create_document(request: DocumentRequest = Depends(parse_document_request)):
             """Создать новый документ"""
             try:
                 name = request.name or "NewDocument"
                 doc_id = self.env.create_document(name)
-                return {
+                return ORJSONResponse({
                     "success": True,
                     "document_id": doc_id,
                     "message": f"Документ '{name}' создан"
-                }
+                })
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.post("/documents/load")
-        async def load_document(request: DocumentRequest):
+        @self.app.post("/documents/load", openapi_extra=DOCUMENT_REQUEST_OPENAPI)
+        async def load_document(request: DocumentRequest = Depends(parse_document_request)):
             """Загрузить документ"""
             try:
                 if not request.filepath:
                     raise HTTPException(status_code=400, detail="Не указан путь к файлу")
                 
                 doc_id = self.env.load_document(request.filepath)
-                return {
+                return ORJSONResponse({
                     "success": True,
                     "document_id": doc_id,
                     "message": f"Документ загружен из {request.filepath}"
-                }
+                })
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.post("/documents/save")
-        async def save_document(request: DocumentRequest):
+        @self.app.post("/documents/save", openapi_extra=DOCUMENT_REQUEST_OPENAPI)
+        async def save_document(request: DocumentRequest = Depends(parse_document_request)):
             """Сохранить документ"""
             try:
                 if not request.filepath:
@@ -100,55 +200,60 @@ class CADAPI:
                 
                 success = self.env.save_document(request.filepath)
                 if success:
-                    return {
+                    return ORJSONResponse({
                         "success": True,
                         "message": f"Документ сохранен в {request.filepath}"
-                    }
+                    })
                 else:
                     raise HTTPException(status_code=500, detail="Ошибка сохранения документа")
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/documents/current/info")
+        @self.app.get("/documents/current/info", response_model=None)
         async def get_current_document_info():
             """Получить информацию о текущем документе"""
             try:
                 info = self.env.get_document_info()
-                return {"success": True, "document_info": info}
+                return ORJSONResponse({"success": True, "document_info": info})
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.post("/commands/execute")
-        async def execute_command(request: CommandRequest):
+        @self.app.post("/commands/execute", openapi_extra=COMMAND_REQUEST_OPENAPI)
+        async def execute_command(request: CommandRequest = Depends(parse_command_request)):
             """Выполнить CAD команду"""
             try:
                 result = self.env.execute_command(
                     request.command, 
                     **request.parameters
                 )
-                return {
+                return ORJSONResponse({
                     "success": True,
                     "command": request.command,
                     "result": result
-                }
+                })
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/history")
+        @self.app.get("/history", response_model=None)
         async def get_history():
             """Получить историю операций"""
             try:
-                history = self.env.get_history()
-                return {"success": True, "history": history}
+                history = self.env.get_history_iter()
+                return StreamingResponse(stream_history(history), media_type="application/json")
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
         
+        @self.app.get("/history/count")
+        async def get_history_count():
+            """Получить число операций в истории"""
+            return ORJSONResponse({"success": True, "count": self.env.get_history_count()})
+        
         @self.app.post("/reset")
         async def reset_environment():
             """Сбросить окружение"""
             try:
                 self.env.reset()
-                return {"success": True, "message": "Окружение сброшено"}
+                return ORJSONResponse({"success": True, "message": "Окружение сброшено"})
             except Exception as e:
                 raise HTTPException(status_code=500, detail=str(e))
     
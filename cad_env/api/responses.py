@@ -0,0 +1,20 @@
+"""
+Классы ответов API на основе orjson
+"""
+
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from ._serialize import dumps
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON ответ, сериализуемый через orjson без прохода через jsonable_encoder
+    """
+    
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
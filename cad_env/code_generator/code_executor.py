@@ -2,33 +2,132 @@
 Исполнитель FreeCAD Python кода
 """
 
+import ast
+import asyncio
+import copy
+import functools
+import hashlib
+import io
+import json
 import logging
-import tempfile
-import os
-from typing import Dict, Any, Optional, List
+import queue
+import subprocess
+import threading
+import time
+import re
+from collections import OrderedDict, deque
+from typing import Dict, Any, Iterator, Optional, List
 from pathlib import Path
 
+from .freecad_worker import read_frame, write_frame
+
 logger = logging.getLogger(__name__)
 
+# Регулярные выражения для анализа кода
+_RE_ADDOBJECT = re.compile(r'addObject\("([^"]+)",\s*"([^"]+)"\)')
+_RE_FREECAD_CALLS = re.compile(r'(?:FreeCAD|doc|Part|Draft)\.(\w+)')
+
+# Имена, обращения к атрибутам которых считаются вызовами FreeCAD
+_FREECAD_NAMES = frozenset({"FreeCAD", "doc", "Part", "Draft"})
+
+# Число результатов, после которого буфер архива истории дописывается в файл
+_ARCHIVE_FLUSH_SIZE = 256
+
+# Скрипт постоянного процесса FreeCAD
+_WORKER_SCRIPT = str(Path(__file__).with_name("freecad_worker.py"))
+
+
+@functools.lru_cache(maxsize=1)
+def _freecad_available() -> bool:
+    """Проверка доступности FreeCAD (выполняется один раз за процесс)"""
+    try:
+        import FreeCAD
+        return True
+    except ImportError:
+        logger.warning("FreeCAD не доступен. Код будет выполняться в режиме симуляции.")
+        return False
+
+
+def _code_key(code: str) -> bytes:
+    """Ключ кэша по содержимому кода"""
+    return hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest()
+
+
+def _worker_result(result: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    """Результат выполнения по ответу процесса FreeCAD"""
+    return {
+        "success": result["return_code"] == 0,
+        "output": result["output"],
+        "error_output": result["error_output"],
+        "execution_time": time.time() - start_time,
+        "return_code": result["return_code"]
+    }
+
+
+def _process_output_result(stdout: bytes, stderr: bytes, return_code: int,
+                           start_time: float) -> Dict[str, Any]:
+    """Результат выполнения по выводу завершившегося процесса FreeCAD"""
+    payload = read_frame(io.BytesIO(stdout))
+    if payload is None:
+        return {
+            "success": False,
+            "output": stdout.decode('utf-8', errors='replace'),
+            "error_output": stderr.decode('utf-8', errors='replace'),
+            "execution_time": time.time() - start_time,
+            "return_code": return_code
+        }
+    
+    return _worker_result(json.loads(payload), start_time)
+
+
+def _read_responses(stream, responses: queue.Queue):
+    """Чтение ответов постоянного процесса FreeCAD в очередь"""
+    try:
+        while True:
+            payload = read_frame(stream)
+            responses.put(payload)
+            if payload is None:
+                return
+    finally:
+        stream.close()
+
 
 class CodeExecutor:
     """
     Исполнитель сгенерированного FreeCAD Python кода
     """
     
-    def __init__(self):
-        """Инициализация исполнителя"""
-        self.execution_history = []
+    def __init__(self, persistent_worker: bool = True, cache_size: int = 4096,
+                 history_size: int = 10_000, history_archive: Optional[str] = None):
+        """
+        Инициализация исполнителя
+        
+        Args:
+            persistent_worker: Выполнять код в одном долгоживущем процессе FreeCAD
+                вместо запуска нового процесса на каждый вызов
+            cache_size: Размер кэша результатов выполнения и валидации (0 - без кэша)
+            history_size: Сколько последних результатов хранить в памяти
+            history_archive: Путь к JSONL файлу, в который дописываются все результаты
+                (пачками по мере накопления и при close)
+        """
+        self.execution_history = deque(maxlen=history_size)
+        self.history_archive = history_archive
+        self._archive_buffer = []
+        self._history_lock = threading.Lock()
+        self.cache_size = cache_size
+        self._exec_cache = OrderedDict()
+        self._validate_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._inflight = {}
         self.freecad_available = self._check_freecad_availability()
+        self.persistent_worker = persistent_worker
+        self._proc = None
+        self._responses = None
+        self._worker_lock = threading.Lock()
     
     def _check_freecad_availability(self) -> bool:
         """Проверка доступности FreeCAD"""
-        try:
-            import FreeCAD
-            return True
-        except ImportError:
-            logger.warning("FreeCAD не доступен. Код будет выполняться в режиме симуляции.")
-            return False
+        return _freecad_available()
     
     def execute_code(self, code: str, timeout: int = 30) -> Dict[str, Any]:
         """
@@ -41,53 +140,212 @@ class CodeExecutor:
         Returns:
             Результат выполнения
         """
+        # Результат зависит только от кода, повторные запуски берем из кэша
+        key = _code_key(code)
+        cached = self._cache_get(self._exec_cache, key)
+        if cached is not None:
+            cached["execution_time"] = 0
+            return cached
+        
         try:
             if self.freecad_available:
-                return self._execute_with_freecad(code, timeout)
+                result = self._execute_with_freecad(code, timeout)
             else:
-                return self._execute_simulation(code)
+                result = self._execute_simulation(code)
                 
         except Exception as e:
-            logger.error(f"Ошибка выполнения кода: {e}")
+            logger.error("Ошибка выполнения кода: %s", e)
             return {
                 "success": False,
                 "error": str(e),
                 "output": "",
                 "execution_time": 0
             }
+        
+        # Таймауты и сбои процесса не кэшируем
+        if result["success"]:
+            self._cache_put(self._exec_cache, key, result)
+        return result
+    
+    async def execute_code_async(self, code: str, timeout: int = 30) -> Dict[str, Any]:
+        """
+        Асинхронное выполнение FreeCAD Python кода
+        
+        Не блокирует цикл событий: разовый запуск FreeCAD выполняется
+        через асинхронный подпроцесс, остальные режимы - в пуле потоков.
+        Одновременные вызовы с одинаковым кодом выполняются один раз.
+        
+        Args:
+            code: Python код для выполнения
+            timeout: Таймаут выполнения в секундах
+            
+        Returns:
+            Результат выполнения
+        """
+        key = _code_key(code)
+        
+        # Такой же код уже выполняется - ждем его результат
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return copy.deepcopy(await asyncio.shield(inflight))
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._execute_code_async(code, timeout, key)
+        except BaseException as e:
+            # Ожидающие вызовы получают ту же ошибку
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._inflight[key]
+        
+        return result
+    
+    async def _execute_code_async(self, code: str, timeout: int, key: bytes) -> Dict[str, Any]:
+        """Асинхронное выполнение без объединения одновременных вызовов"""
+        if not self.freecad_available or self.persistent_worker:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, functools.partial(self.execute_code, code, timeout)
+            )
+        
+        cached = self._cache_get(self._exec_cache, key)
+        if cached is not None:
+            cached["execution_time"] = 0
+            return cached
+        
+        result = await self._execute_once_async(code, timeout)
+        if result["success"]:
+            self._cache_put(self._exec_cache, key, result)
+        return result
+    
+    def _cache_get(self, cache: OrderedDict, key: bytes) -> Optional[Dict[str, Any]]:
+        """Получить копию результата из кэша"""
+        with self._cache_lock:
+            if key not in cache:
+                return None
+            cache.move_to_end(key)
+            return copy.deepcopy(cache[key])
+    
+    def _cache_put(self, cache: OrderedDict, key: bytes, result: Dict[str, Any]):
+        """Сохранить копию результата в кэш, вытесняя самые старые записи"""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            cache[key] = copy.deepcopy(result)
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Очистить кэш результатов"""
+        with self._cache_lock:
+            self._exec_cache.clear()
+            self._validate_cache.clear()
     
     def _execute_with_freecad(self, code: str, timeout: int) -> Dict[str, Any]:
         """Выполнение с реальным FreeCAD"""
-        import time
-        import subprocess
-        import tempfile
+        if self.persistent_worker:
+            return self._execute_with_worker(code, timeout)
+        return self._execute_once(code, timeout)
+    
+    def _start_worker(self):
+        """Запуск постоянного процесса FreeCAD"""
+        self._proc = subprocess.Popen(
+            ['freecad', '-c', _WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self._responses = queue.Queue()
+        
+        # Ответы читаются в отдельном потоке, чтобы можно было ждать их с таймаутом
+        reader = threading.Thread(
+            target=_read_responses,
+            args=(self._proc.stdout, self._responses),
+            daemon=True
+        )
+        reader.start()
+        logger.info("Запущен постоянный процесс FreeCAD")
+    
+    def close(self):
+        """Остановить постоянный процесс FreeCAD и дописать буфер архива истории"""
+        self.flush_history()
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdin.close()
+    
+    def _execute_with_worker(self, code: str, timeout: int) -> Dict[str, Any]:
+        """Выполнение в постоянном процессе FreeCAD"""
+        start_time = time.time()
+        
+        with self._worker_lock:
+            try:
+                if self._proc is None or self._proc.poll() is not None:
+                    self.close()
+                    self._start_worker()
+                
+                write_frame(self._proc.stdin, code.encode('utf-8'))
+                payload = self._responses.get(timeout=timeout)
+                
+            except queue.Empty:
+                # Зависший процесс останавливаем, следующий вызов запустит новый
+                self.close()
+                return {
+                    "success": False,
+                    "error": f"Таймаут выполнения ({timeout}s)",
+                    "output": "",
+                    "execution_time": timeout
+                }
+            except Exception as e:
+                self.close()
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "output": "",
+                    "execution_time": time.time() - start_time
+                }
+            
+            if payload is None:
+                self.close()
+                return {
+                    "success": False,
+                    "error": "Процесс FreeCAD неожиданно завершился",
+                    "output": "",
+                    "execution_time": time.time() - start_time
+                }
         
+        return _worker_result(json.loads(payload), start_time)
+    
+    def _execute_once(self, code: str, timeout: int) -> Dict[str, Any]:
+        """Выполнение в отдельном процессе FreeCAD"""
         start_time = time.time()
         
-        # Создаем временный файл с кодом
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
+        # Код передается через stdin одним сообщением, без временного файла;
+        # после закрытия stdin процесс завершается сам
+        request = io.BytesIO()
+        write_frame(request, code.encode('utf-8'))
         
         try:
-            # Выполняем код через FreeCAD
-            result = subprocess.run(
-                ['freecad', '-c', temp_file],
+            completed = subprocess.run(
+                ['freecad', '-c', _WORKER_SCRIPT],
+                input=request.getvalue(),
                 capture_output=True,
-                text=True,
                 timeout=timeout
             )
             
-            execution_time = time.time() - start_time
-            
-            return {
-                "success": result.returncode == 0,
-                "output": result.stdout,
-                "error_output": result.stderr,
-                "execution_time": execution_time,
-                "return_code": result.returncode
-            }
-            
         except subprocess.TimeoutExpired:
             return {
                 "success": False,
@@ -102,16 +360,51 @@ class CodeExecutor:
                 "output": "",
                 "execution_time": time.time() - start_time
             }
-        finally:
-            # Удаляем временный файл
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        
+        return _process_output_result(
+            completed.stdout, completed.stderr, completed.returncode, start_time
+        )
+    
+    async def _execute_once_async(self, code: str, timeout: int) -> Dict[str, Any]:
+        """Выполнение в отдельном процессе FreeCAD без блокировки цикла событий"""
+        start_time = time.time()
+        
+        request = io.BytesIO()
+        write_frame(request, code.encode('utf-8'))
+        
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                'freecad', '-c', _WORKER_SCRIPT,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(request.getvalue()), timeout
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                return {
+                    "success": False,
+                    "error": f"Таймаут выполнения ({timeout}s)",
+                    "output": "",
+                    "execution_time": timeout
+                }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": "",
+                "execution_time": time.time() - start_time
+            }
+        
+        return _process_output_result(stdout, stderr, proc.returncode, start_time)
     
     def _execute_simulation(self, code: str) -> Dict[str, Any]:
         """Симуляция выполнения кода"""
-        import time
-        import re
-        
         start_time = time.time()
         
         # Анализируем код для симуляции
@@ -144,7 +437,7 @@ class CodeExecutor:
             
             # Анализируем создание объектов
             if 'addObject' in line:
-                obj_match = re.search(r'addObject\("([^"]+)",\s*"([^"]+)"\)', line)
+                obj_match = _RE_ADDOBJECT.search(line)
                 if obj_match:
                     obj_type = obj_match.group(1)
                     obj_name = obj_match.group(2)
@@ -207,26 +500,37 @@ class CodeExecutor:
         Returns:
             Результат валидации
         """
-        import ast
+        key = _code_key(code)
+        cached = self._cache_get(self._validate_cache, key)
+        if cached is not None:
+            return cached
         
+        result = self._validate(code)
+        self._cache_put(self._validate_cache, key, result)
+        return result
+    
+    def _validate(self, code: str) -> Dict[str, Any]:
+        """Валидация кода без использования кэша"""
         try:
             # Парсим код
             tree = ast.parse(code)
             
-            # Анализируем синтаксис
+            # Один обход дерева: обращения к FreeCAD, doc, Part и Draft
             syntax_errors = []
+            freecad_calls = set()
             for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    # Проверяем вызовы FreeCAD
-                    if hasattr(node.func, 'attr'):
-                        if node.func.attr in ['addObject', 'newDocument']:
-                            pass  # Валидные вызовы
+                if (isinstance(node, ast.Attribute)
+                        and isinstance(node.value, ast.Name)
+                        and node.value.id in _FREECAD_NAMES):
+                    freecad_calls.add(node.attr)
+            
+            freecad_calls = list(freecad_calls)
             
             return {
                 "valid": True,
                 "syntax_errors": syntax_errors,
-                "freecad_calls": self._extract_freecad_calls(code),
-                "complexity": self._calculate_code_complexity(code)
+                "freecad_calls": freecad_calls,
+                "complexity": self._calculate_code_complexity(code, freecad_calls)
             }
             
         except SyntaxError as e:
@@ -243,39 +547,68 @@ class CodeExecutor:
     
     def _extract_freecad_calls(self, code: str) -> List[str]:
         """Извлечение вызовов FreeCAD из кода"""
-        import re
-        
-        freecad_calls = []
-        
-        # Поиск вызовов FreeCAD
-        patterns = [
-            r'FreeCAD\.(\w+)',
-            r'doc\.(\w+)',
-            r'Part\.(\w+)',
-            r'Draft\.(\w+)'
-        ]
+        # Один проход по коду, повторяющиеся вызовы сразу отбрасываются
+        freecad_calls = set(_RE_FREECAD_CALLS.findall(code))
         
-        for pattern in patterns:
-            matches = re.findall(pattern, code)
-            freecad_calls.extend(matches)
-        
-        return list(set(freecad_calls))
+        return list(freecad_calls)
     
-    def _calculate_code_complexity(self, code: str) -> Dict[str, int]:
+    def _calculate_code_complexity(self, code: str,
+                                   freecad_calls: Optional[List[str]] = None) -> Dict[str, int]:
         """Расчет сложности кода"""
+        if freecad_calls is None:
+            freecad_calls = self._extract_freecad_calls(code)
+        
         lines = code.split('\n')
+        code_lines = 0
+        comment_lines = 0
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if not line.startswith('#'):
+                code_lines += 1
+            if stripped.startswith('#'):
+                comment_lines += 1
         
         return {
             "total_lines": len(lines),
-            "code_lines": len([line for line in lines if line.strip() and not line.startswith('#')]),
-            "comment_lines": len([line for line in lines if line.strip().startswith('#')]),
-            "freecad_calls": len(self._extract_freecad_calls(code))
+            "code_lines": code_lines,
+            "comment_lines": comment_lines,
+            "freecad_calls": len(freecad_calls)
         }
     
     def get_execution_history(self) -> List[Dict[str, Any]]:
         """Получить историю выполнения"""
-        return self.execution_history.copy()
+        with self._history_lock:
+            return list(self.execution_history)
+    
+    def iter_history(self) -> Iterator[Dict[str, Any]]:
+        """Итератор по снимку истории выполнения, безопасный при параллельной записи"""
+        with self._history_lock:
+            snapshot = tuple(self.execution_history)
+        return iter(snapshot)
     
     def save_execution_result(self, result: Dict[str, Any]):
         """Сохранить результат выполнения"""
-        self.execution_history.append(result)
+        with self._history_lock:
+            self.execution_history.append(result)
+            
+            # В памяти остаются только последние результаты, полная история - в архиве.
+            # Результат сериализуется сразу, а в файл попадает пачкой
+            if self.history_archive:
+                self._archive_buffer.append(json.dumps(result, ensure_ascii=False, default=str) + '\n')
+                if len(self._archive_buffer) >= _ARCHIVE_FLUSH_SIZE:
+                    self._flush_archive()
+    
+    def flush_history(self):
+        """Дописать накопленные результаты в архив истории"""
+        with self._history_lock:
+            self._flush_archive()
+    
+    def _flush_archive(self):
+        """Дописать буфер архива в файл (вызывается под _history_lock, чтобы пачки не перемешивались)"""
+        if not self._archive_buffer:
+            return
+        with open(self.history_archive, 'a', encoding='utf-8') as f:
+            f.writelines(self._archive_buffer)
+        self._archive_buffer.clear()
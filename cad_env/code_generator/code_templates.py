@@ -2,58 +2,51 @@
 Шаблоны FreeCAD Python кода
 """
 
+import functools
 from typing import Dict, Any, Optional
 
+# Заполнение шаблонов с кэшем по аргументам: при генерации датасетов одни и те же
+# параметры повторяются. typed=True различает 10 и 10.0, которые дают разный код.
+_format_template = functools.lru_cache(maxsize=1024, typed=True)(str.format)
+
 
 class FreeCADTemplates:
     """
     Шаблоны для генерации FreeCAD Python кода
     """
     
-    def create_box(self, length: float = 10, width: float = 10, height: float = 10) -> str:
-        """Создание коробки"""
-        return f"""# Создание коробки
+    _BOX_TPL = """# Создание коробки
 box = doc.addObject("Part::Box", "Box_{length}x{width}x{height}")
 box.Length = {length}
 box.Width = {width}
 box.Height = {height}
 doc.recompute()"""
     
-    def create_cylinder(self, radius: float = 5, height: float = 10) -> str:
-        """Создание цилиндра"""
-        return f"""# Создание цилиндра
+    _CYLINDER_TPL = """# Создание цилиндра
 cylinder = doc.addObject("Part::Cylinder", "Cylinder_r{radius}_h{height}")
 cylinder.Radius = {radius}
 cylinder.Height = {height}
 doc.recompute()"""
     
-    def create_sphere(self, radius: float = 5) -> str:
-        """Создание сферы"""
-        return f"""# Создание сферы
+    _SPHERE_TPL = """# Создание сферы
 sphere = doc.addObject("Part::Sphere", "Sphere_r{radius}")
 sphere.Radius = {radius}
 doc.recompute()"""
     
-    def create_cone(self, radius1: float = 5, radius2: float = 0, height: float = 10) -> str:
-        """Создание конуса"""
-        return f"""# Создание конуса
+    _CONE_TPL = """# Создание конуса
 cone = doc.addObject("Part::Cone", "Cone_r1{radius1}_r2{radius2}_h{height}")
 cone.Radius1 = {radius1}
 cone.Radius2 = {radius2}
 cone.Height = {height}
 doc.recompute()"""
     
-    def create_torus(self, radius1: float = 10, radius2: float = 3) -> str:
-        """Создание тора"""
-        return f"""# Создание тора
+    _TORUS_TPL = """# Создание тора
 torus = doc.addObject("Part::Torus", "Torus_r1{radius1}_r2{radius2}")
 torus.Radius1 = {radius1}
 torus.Radius2 = {radius2}
 doc.recompute()"""
     
-    def rotate(self, angle: float = 90, axis: str = "Z") -> str:
-        """Поворот объекта"""
-        return f"""# Поворот объекта
+    _ROTATE_TPL = """# Поворот объекта
 import math
 rotation_angle = math.radians({angle})
 if "{axis}".upper() == "X":
@@ -69,9 +62,7 @@ if doc.Objects:
     last_obj.Placement = last_obj.Placement * FreeCAD.Placement(FreeCAD.Vector(0,0,0), FreeCAD.Rotation(rotation_axis, rotation_angle))
 doc.recompute()"""
     
-    def translate(self, x: float = 0, y: float = 0, z: float = 0) -> str:
-        """Перемещение объекта"""
-        return f"""# Перемещение объекта
+    _TRANSLATE_TPL = """# Перемещение объекта
 translation_vector = FreeCAD.Vector({x}, {y}, {z})
 
 # Применяем перемещение к последнему объекту
@@ -80,9 +71,7 @@ if doc.Objects:
     last_obj.Placement = last_obj.Placement * FreeCAD.Placement(translation_vector, FreeCAD.Rotation())
 doc.recompute()"""
     
-    def scale(self, factor: float = 2) -> str:
-        """Масштабирование объекта"""
-        return f"""# Масштабирование объекта
+    _SCALE_TPL = """# Масштабирование объекта
 scale_factor = {factor}
 
 # Применяем масштабирование к последнему объекту
@@ -91,9 +80,7 @@ if doc.Objects:
     last_obj.Placement = last_obj.Placement * FreeCAD.Placement(FreeCAD.Vector(0,0,0), FreeCAD.Rotation(), FreeCAD.Vector(scale_factor, scale_factor, scale_factor))
 doc.recompute()"""
     
-    def extrude(self, distance: float = 5) -> str:
-        """Выдавливание объекта"""
-        return f"""# Выдавливание объекта
+    _EXTRUDE_TPL = """# Выдавливание объекта
 extrude_distance = {distance}
 
 # Создаем выдавливание последнего объекта
@@ -107,33 +94,103 @@ if doc.Objects:
         extrude_obj.Dir = FreeCAD.Vector(0, 0, extrude_distance)
         doc.recompute()"""
     
-    def union(self) -> str:
-        """Объединение объектов"""
-        return """# Объединение объектов
+    _UNION_TPL = """# Объединение объектов
 if len(doc.Objects) >= 2:
     union_obj = doc.addObject("Part::Fuse", "Union")
     union_obj.Base = doc.Objects[-2]
     union_obj.Tool = doc.Objects[-1]
     doc.recompute()"""
     
-    def cut(self) -> str:
-        """Вычитание объектов"""
-        return """# Вычитание объектов
+    _CUT_TPL = """# Вычитание объектов
 if len(doc.Objects) >= 2:
     cut_obj = doc.addObject("Part::Cut", "Cut")
     cut_obj.Base = doc.Objects[-2]
     cut_obj.Tool = doc.Objects[-1]
     doc.recompute()"""
     
-    def intersection(self) -> str:
-        """Пересечение объектов"""
-        return """# Пересечение объектов
+    _INTERSECTION_TPL = """# Пересечение объектов
 if len(doc.Objects) >= 2:
     intersection_obj = doc.addObject("Part::Common", "Intersection")
     intersection_obj.Base = doc.Objects[-2]
     intersection_obj.Tool = doc.Objects[-1]
     doc.recompute()"""
     
+    _FILLET_TPL = """# Создание скругления
+fillet_radius = {radius}
+if doc.Objects:
+    last_obj = doc.Objects[-1]
+    # Применяем скругление к ребрам
+    edges = last_obj.Shape.Edges
+    if edges:
+        fillet = doc.addObject("Part::Fillet", "Fillet")
+        fillet.Base = last_obj
+        # Настройка скругления для всех ребер
+        for i, edge in enumerate(edges):
+            fillet.addEdge(i, fillet_radius)
+        doc.recompute()"""
+    
+    _CHAMFER_TPL = """# Создание фаски
+chamfer_distance = {distance}
+if doc.Objects:
+    last_obj = doc.Objects[-1]
+    # Применяем фаску к ребрам
+    edges = last_obj.Shape.Edges
+    if edges:
+        chamfer = doc.addObject("Part::Chamfer", "Chamfer")
+        chamfer.Base = last_obj
+        # Настройка фаски для всех ребер
+        for i, edge in enumerate(edges):
+            chamfer.addEdge(i, chamfer_distance)
+        doc.recompute()"""
+    
+    def create_box(self, length: float = 10, width: float = 10, height: float = 10) -> str:
+        """Создание коробки"""
+        return _format_template(self._BOX_TPL, length=length, width=width, height=height)
+    
+    def create_cylinder(self, radius: float = 5, height: float = 10) -> str:
+        """Создание цилиндра"""
+        return _format_template(self._CYLINDER_TPL, radius=radius, height=height)
+    
+    def create_sphere(self, radius: float = 5) -> str:
+        """Создание сферы"""
+        return _format_template(self._SPHERE_TPL, radius=radius)
+    
+    def create_cone(self, radius1: float = 5, radius2: float = 0, height: float = 10) -> str:
+        """Создание конуса"""
+        return _format_template(self._CONE_TPL, radius1=radius1, radius2=radius2, height=height)
+    
+    def create_torus(self, radius1: float = 10, radius2: float = 3) -> str:
+        """Создание тора"""
+        return _format_template(self._TORUS_TPL, radius1=radius1, radius2=radius2)
+    
+    def rotate(self, angle: float = 90, axis: str = "Z") -> str:
+        """Поворот объекта"""
+        return _format_template(self._ROTATE_TPL, angle=angle, axis=axis)
+    
+    def translate(self, x: float = 0, y: float = 0, z: float = 0) -> str:
+        """Перемещение объекта"""
+        return _format_template(self._TRANSLATE_TPL, x=x, y=y, z=z)
+    
+    def scale(self, factor: float = 2) -> str:
+        """Масштабирование объекта"""
+        return _format_template(self._SCALE_TPL, factor=factor)
+    
+    def extrude(self, distance: float = 5) -> str:
+        """Выдавливание объекта"""
+        return _format_template(self._EXTRUDE_TPL, distance=distance)
+    
+    def union(self) -> str:
+        """Объединение объектов"""
+        return self._UNION_TPL
+    
+    def cut(self) -> str:
+        """Вычитание объектов"""
+        return self._CUT_TPL
+    
+    def intersection(self) -> str:
+        """Пересечение объектов"""
+        return self._INTERSECTION_TPL
+    
     def create_sketch(self, points: list) -> str:
         """Создание эскиза"""
         points_str = ", ".join([f"FreeCAD.Vector({p[0]}, {p[1]}, {p[2]})" for p in points])
@@ -159,32 +216,8 @@ doc.recompute()"""
     
     def create_fillet(self, radius: float = 1) -> str:
         """Создание скругления"""
-        return f"""# Создание скругления
-fillet_radius = {radius}
-if doc.Objects:
-    last_obj = doc.Objects[-1]
-    # Применяем скругление к ребрам
-    edges = last_obj.Shape.Edges
-    if edges:
-        fillet = doc.addObject("Part::Fillet", "Fillet")
-        fillet.Base = last_obj
-        # Настройка скругления для всех ребер
-        for i, edge in enumerate(edges):
-            fillet.addEdge(i, fillet_radius)
-        doc.recompute()"""
+        return _format_template(self._FILLET_TPL, radius=radius)
     
     def create_chamfer(self, distance: float = 1) -> str:
         """Создание фаски"""
-        return f"""# Создание фаски
-chamfer_distance = {distance}
-if doc.Objects:
-    last_obj = doc.Objects[-1]
-    # Применяем фаску к ребрам
-    edges = last_obj.Shape.Edges
-    if edges:
-        chamfer = doc.addObject("Part::Chamfer", "Chamfer")
-        chamfer.Base = last_obj
-        # Настройка фаски для всех ребер
-        for i, edge in enumerate(edges):
-            chamfer.addEdge(i, chamfer_distance)
-        doc.recompute()"""
+        return _format_template(self._CHAMFER_TPL, distance=distance)
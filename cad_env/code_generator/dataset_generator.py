@@ -2,97 +2,463 @@
 Генератор датасетов для обучения LLM
 """
 
-import json
-import random
+import io
 import logging
-from typing import Dict, Any, List, Tuple
+import math
+import mmap
+import multiprocessing
+from itertools import islice
+from string import Formatter
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, List, Optional, Sequence, Sized, Tuple
 from pathlib import Path
-from .freecad_code_generator import FreeCADCodeGenerator
+
+import numpy as np
+import orjson
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .freecad_code_generator import _SCRIPT_FOOTER, _SCRIPT_HEADER, _SCRIPT_STEP, FreeCADCodeGenerator
 
 logger = logging.getLogger(__name__)
 
+# Распределения случайных параметров для каждого намерения:
+# кортеж (min, max) - равномерное распределение с округлением до 0.1,
+# список - равновероятный выбор одного из значений
+_PARAMETER_SPECS = {
+    "create_box": {"length": (5, 50), "width": (5, 50), "height": (5, 50)},
+    "create_cylinder": {"radius": (2, 20), "height": (5, 30)},
+    "create_sphere": {"radius": (2, 15)},
+    "create_cone": {"radius1": (3, 20), "height": (5, 25)},
+    "create_torus": {"radius1": (8, 25), "radius2": (2, 8)},
+    "rotate": {"angle": [45, 90, 135, 180, 270], "axis": ["X", "Y", "Z"]},
+    "translate": {"distance": (5, 25), "axis": ["X", "Y", "Z"]},
+    "scale": {"factor": (0.5, 3.0)},
+    "extrude": {"distance": (2, 15)},
+    "create_fillet": {"radius": (0.5, 3.0)},
+    "create_chamfer": {"distance": (0.5, 2.0)},
+}
+
+# Размер блока образцов, для которого параметры разыгрываются одним вызовом
+_SAMPLE_BLOCK_SIZE = 4096
+
+# Размер пачки образцов, для которой сложность кода считается одним вызовом
+_BUILD_BATCH_SIZE = 256
+
+# Верхние границы числа строк для уровней сложности кода
+_COMPLEXITY_BOUNDS = np.array([5, 15])
+_COMPLEXITY_LABELS = ("low", "medium", "high")
+
+# Категории намерений
+_INTENT_CATEGORY = {
+    **{intent: "creation" for intent in (
+        "create_box", "create_cylinder", "create_sphere", "create_cone",
+        "create_torus", "create_fillet", "create_chamfer",
+    )},
+    **{intent: "transformation" for intent in ("rotate", "translate", "scale", "extrude")},
+    **{intent: "boolean" for intent in ("union", "cut", "intersection")},
+}
+
+# Уровень сжатия датасетов .zst: сжатие дешевле записи несжатого текста
+_ZSTD_LEVEL = 3
+
+# Бинарный формат датасета: сигнатура, строка заголовка JSON, массив записей
+# фиксированной длины и пул строк в UTF-8
+_BINARY_MAGIC = b"CADDS1\n"
+
+# Категориальные поля образца, хранимые в записи кодом из словаря заголовка
+_BINARY_VOCAB_FIELDS = ("intent", "category", "complexity")
+
+# Запись образца: коды категориальных полей (-1 - поле отсутствует),
+# длины строк образца в пуле и смещение первой из них
+_BINARY_RECORD = np.dtype([
+    ("intent", "<i2"), ("category", "i1"), ("complexity", "i1"),
+    ("id_len", "<u4"), ("desc_len", "<u4"), ("code_len", "<u4"), ("params_len", "<u4"),
+    ("offset", "<u8"),
+])
+
+# Сложные сценарии в виде "Заголовок: шаг, шаг, ..."
+_SCENARIO_TEMPLATES = (
+    # Создание механических деталей
+    "Создай болт с резьбой: создай цилиндр, добавь головку, создай резьбу",
+    "Создай шестерню: создай цилиндр, добавь зубья, создай отверстие",
+    "Создай корпус: создай коробку, вычти внутреннее пространство, добавь отверстия",
+
+    # Архитектурные элементы
+    "Создай колонну: создай цилиндр, добавь капитель, создай базу",
+    "Создай арку: создай полукруг, выдави, добавь опоры",
+    "Создай купол: создай сферу, обрежь нижнюю часть",
+
+    # Технические детали
+    "Создай подшипник: создай внешнее кольцо, внутреннее кольцо, шарики",
+    "Создай пружину: создай спираль, выдави по траектории",
+    "Создай трубу: создай цилиндр, вычти внутренний цилиндр",
+)
+
+
+def _parse_scenario(description: str) -> Tuple[str, str, Tuple[str, ...]]:
+    """Разбор сценария на описание, заголовок и шаги"""
+    title, steps = description.split(": ", 1)
+    return description, title, tuple(step.strip() for step in steps.split(", "))
+
+
+# Сценарии разбираются один раз при импорте
+_SCENARIOS = tuple(_parse_scenario(description) for description in _SCENARIO_TEMPLATES)
+
+
+def _bucket_complexity(line_counts: np.ndarray) -> np.ndarray:
+    """
+    Уровни сложности кода по числу строк
+    
+    Args:
+        line_counts: Числа строк кода
+        
+    Returns:
+        Индексы в _COMPLEXITY_LABELS
+    """
+    return np.searchsorted(_COMPLEXITY_BOUNDS, line_counts, side="left")
+
+
+def _check_template_fields(template: str, intent: str):
+    """
+    Проверка, что все поля шаблона описания заполняются параметрами намерения
+    
+    Args:
+        template: Шаблон описания
+        intent: Намерение
+        
+    Raises:
+        ValueError: Если для поля шаблона нет параметра
+    """
+    fields = {name for _, name, _, _ in Formatter().parse(template) if name}
+    missing = fields - _PARAMETER_SPECS.get(intent, {}).keys()
+    if missing:
+        raise ValueError(f"Нет параметров {sorted(missing)} для шаблона '{template}'")
+
+
+# Шаблоны описаний обучающих образцов и их намерения
+_TRAINING_TEMPLATES = (
+    # Создание базовых объектов
+    ("Создай коробку размером {length}x{width}x{height}", "create_box"),
+    ("Создай цилиндр радиусом {radius} и высотой {height}", "create_cylinder"),
+    ("Создай сферу радиусом {radius}", "create_sphere"),
+    ("Создай конус с радиусом основания {radius1} и высотой {height}", "create_cone"),
+    ("Создай тор с внешним радиусом {radius1} и внутренним {radius2}", "create_torus"),
+
+    # Трансформации
+    ("Поверни объект на {angle} градусов вокруг оси {axis}", "rotate"),
+    ("Перемести объект на {distance} единиц по оси {axis}", "translate"),
+    ("Увеличь объект в {factor} раз", "scale"),
+    ("Выдави объект на {distance} единиц", "extrude"),
+
+    # Булевы операции
+    ("Объедини два объекта", "union"),
+    ("Вычти один объект из другого", "cut"),
+    ("Найди пересечение объектов", "intersection"),
+
+    # Сложные операции
+    ("Создай скругление радиусом {radius}", "create_fillet"),
+    ("Создай фаску размером {distance}", "create_chamfer"),
+)
+
+# Поля шаблонов проверяются один раз при импорте, а не при заполнении каждого образца
+for _template, _intent in _TRAINING_TEMPLATES:
+    _check_template_fields(_template, _intent)
+del _template, _intent
+
+# Более сложные и разнообразные примеры для валидации
+_VALIDATION_TEMPLATES = (
+    "Создай деталь для механизма: коробка 20x15x10, вычти цилиндр радиусом 3, добавь отверстия",
+    "Создай архитектурный элемент: колонна высотой 30, диаметром 5, с капителью",
+    "Создай техническую деталь: подшипник с внешним диаметром 20, внутренним 10",
+    "Создай декоративный элемент: сложная форма из нескольких примитивов",
+)
+
+
+def _iter_json_samples(f: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Чтение образцов из JSON-документа вида {"metadata": ..., "samples": [...]}
+    
+    Args:
+        f: Открытый в бинарном режиме файл
+        
+    Returns:
+        Итератор по образцам
+    """
+    if ijson is not None:
+        # use_float: числа как float, а не Decimal, как при обычном разборе JSON
+        yield from ijson.items(f, "samples.item", use_float=True)
+    else:
+        yield from orjson.loads(f.read()).get("samples", [])
+
+
+def _open_dataset_file(filepath: str, mode: str) -> BinaryIO:
+    """
+    Открыть файл датасета в бинарном режиме
+    
+    Файлы с расширением .zst сжимаются и распаковываются потоково через zstandard.
+    
+    Args:
+        filepath: Путь к файлу
+        mode: Режим открытия, 'rb' или 'wb'
+        
+    Returns:
+        Бинарный файловый объект
+    """
+    if not filepath.endswith(".zst"):
+        return open(filepath, mode)
+    
+    if zstandard is None:
+        raise ImportError("Для сжатых датасетов (.zst) требуется пакет zstandard")
+    
+    if mode == "wb":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).stream_writer(open(filepath, "wb"))
+    # Буфер поверх потока распаковки дает построчное чтение
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(filepath, "rb")))
+
+
+def _reservoir_indices(n: int, k: int, rng: np.random.Generator) -> List[int]:
+    """
+    Равномерный выбор k позиций из потока длины n (алгоритм L)
+    
+    Пропуски между выбранными позициями вычисляются сразу,
+    поэтому время и память зависят от k, а не от n.
+    
+    Args:
+        n: Длина потока
+        k: Размер резервуара
+        rng: Генератор случайных чисел
+        
+    Returns:
+        Отсортированный список выбранных позиций (пустой при k <= 0)
+    """
+    if k <= 0:
+        return []
+    if n <= k:
+        return list(range(n))
+    
+    reservoir = list(range(k))
+    # 1 - random() лежит в (0, 1], логарифм всегда конечен
+    w = math.exp(math.log(1.0 - rng.random()) / k)
+    i = k - 1
+    while True:
+        i += math.floor(math.log(1.0 - rng.random()) / math.log1p(-w)) + 1
+        if i >= n:
+            break
+        reservoir[int(rng.integers(k))] = i
+        w *= math.exp(math.log(1.0 - rng.random()) / k)
+    
+    return sorted(reservoir)
+
+
+# Генератор образцов процесса пула, создается инициализатором пула
+_worker_generator = None
+
+
+def _init_worker():
+    """Создание генератора образцов в процессе пула"""
+    global _worker_generator
+    _worker_generator = DatasetGenerator()
+
+
+def _build_batch(batch: List[Tuple[str, str, str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Построение пачки образцов в процессе пула"""
+    return _worker_generator._build_samples(batch)
+
 
 class DatasetGenerator:
     """
     Генератор датасетов для обучения LLM работе с FreeCAD
     """
     
-    def __init__(self):
-        """Инициализация генератора"""
+    def __init__(self, seed: Optional[int] = None, track_history: bool = False):
+        """
+        Инициализация генератора
+        
+        Args:
+            seed: Зерно генератора случайных параметров
+            track_history: Сохранять сгенерированные образцы в generated_samples
+        """
         self.code_generator = FreeCADCodeGenerator()
         self.generated_samples = []
+        self.track_history = track_history
+        self._rng = np.random.default_rng(seed)
     
-    def generate_training_dataset(self, num_samples: int = 1000) -> List[Dict[str, Any]]:
+    def generate_training_dataset(self, num_samples: int = 1000,
+                                  num_proc: Optional[int] = None,
+                                  reservoir_size: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Генерация датасета для обучения
         
         Args:
             num_samples: Количество образцов
+            num_proc: Количество процессов для генерации кода (None или 1 - в текущем процессе)
+            reservoir_size: Размер равномерной случайной подвыборки из num_samples позиций;
+                код генерируется только для выбранных позиций
             
         Returns:
             Список образцов для обучения
         """
-        samples = []
+        samples = list(self.iter_training_dataset(num_samples, num_proc, reservoir_size))
+        
+        if self.track_history:
+            self.generated_samples.extend(samples)
+        
+        logger.info("Сгенерировано %d образцов из %d позиций", len(samples), num_samples)
+        return samples
+    
+    def iter_training_dataset(self, num_samples: int = 1000,
+                              num_proc: Optional[int] = None,
+                              reservoir_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковая генерация датасета для обучения
+        
+        Параметры разыгрываются блоками по _SAMPLE_BLOCK_SIZE образцов,
+        поэтому память не растет с num_samples.
         
-        # Шаблоны для генерации
-        templates = [
-            # Создание базовых объектов
-            ("Создай коробку размером {length}x{width}x{height}", "create_box"),
-            ("Создай цилиндр радиусом {radius} и высотой {height}", "create_cylinder"),
-            ("Создай сферу радиусом {radius}", "create_sphere"),
-            ("Создай конус с радиусом основания {radius1} и высотой {height}", "create_cone"),
-            ("Создай тор с внешним радиусом {radius1} и внутренним {radius2}", "create_torus"),
+        Args:
+            num_samples: Количество образцов
+            num_proc: Количество процессов для генерации кода (None или 1 - в текущем процессе)
+            reservoir_size: Размер равномерной случайной подвыборки из num_samples позиций
             
-            # Трансформации
-            ("Поверни объект на {angle} градусов вокруг оси {axis}", "rotate"),
-            ("Перемести объект на {distance} единиц по оси {axis}", "translate"),
-            ("Увеличь объект в {factor} раз", "scale"),
-            ("Выдави объект на {distance} единиц", "extrude"),
+        Returns:
+            Итератор по образцам
+        """
+        if reservoir_size is not None:
+            sample_ids = _reservoir_indices(num_samples, reservoir_size, self._rng)
+        else:
+            sample_ids = range(num_samples)
+        
+        items = self._iter_items(sample_ids)
+        
+        if num_proc is not None and num_proc > 1 and len(sample_ids) > 1:
+            # Параметры уже разыграны в текущем процессе, поэтому результат
+            # не зависит от числа процессов; в пул уходит только генерация кода
+            batch_size = min(_SAMPLE_BLOCK_SIZE, -(-len(sample_ids) // (num_proc * 4)))
+            batches = iter(lambda: list(islice(items, batch_size)), [])
             
-            # Булевы операции
-            ("Объедини два объекта", "union"),
-            ("Вычти один объект из другого", "cut"),
-            ("Найди пересечение объектов", "intersection"),
+            with multiprocessing.Pool(num_proc, initializer=_init_worker) as pool:
+                for batch_samples in pool.imap(_build_batch, batches):
+                    yield from batch_samples
+        else:
+            batches = iter(lambda: list(islice(items, _BUILD_BATCH_SIZE)), [])
+            for batch in batches:
+                yield from self._build_samples(batch)
+    
+    def generate_and_save(self, filepath: str, num_samples: int = 1000, **kwargs):
+        """
+        Генерация датасета для обучения с записью в файл по мере генерации
+        
+        Args:
+            filepath: Путь к файлу JSONL
+            num_samples: Количество образцов
+            **kwargs: Дополнительные аргументы iter_training_dataset
+        """
+        self.save_dataset(self.iter_training_dataset(num_samples, **kwargs), filepath)
+    
+    def _iter_items(self, sample_ids: Sequence[int]) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        """
+        Розыгрыш шаблонов и параметров для заданных позиций
+        
+        Args:
+            sample_ids: Номера образцов
             
-            # Сложные операции
-            ("Создай скругление радиусом {radius}", "create_fillet"),
-            ("Создай фаску размером {distance}", "create_chamfer"),
-        ]
+        Returns:
+            Итератор по кортежам (идентификатор, шаблон, намерение, параметры)
+        """
+        templates = _TRAINING_TEMPLATES
         
-        for i in range(num_samples):
-            try:
-                # Выбираем случайный шаблон
-                template, intent = random.choice(templates)
-                
-                # Генерируем параметры
-                parameters = self._generate_random_parameters(intent)
-                
-                # Заполняем шаблон
-                description = template.format(**parameters)
-                
-                # Генерируем код
-                result = self.code_generator.generate_from_natural_language(description)
-                
-                if result["success"]:
-                    sample = {
-                        "id": f"sample_{i:06d}",
-                        "description": description,
-                        "intent": intent,
-                        "parameters": parameters,
-                        "generated_code": result["generated_code"],
-                        "complexity": self._calculate_complexity(result["generated_code"]),
-                        "category": self._categorize_intent(intent)
-                    }
-                    samples.append(sample)
-                    self.generated_samples.append(sample)
+        for start in range(0, len(sample_ids), _SAMPLE_BLOCK_SIZE):
+            block_ids = sample_ids[start:start + _SAMPLE_BLOCK_SIZE]
+            
+            # Шаблоны и параметры разыгрываются сразу для всего блока:
+            # по одному вызову numpy на столбец вместо вызовов random на каждый образец
+            template_indices = self._rng.integers(0, len(templates), len(block_ids))
+            counts = np.bincount(template_indices, minlength=len(templates))
+            parameter_columns = [
+                self._sample_parameter_columns(intent, int(count))
+                for (_, intent), count in zip(templates, counts)
+            ]
+            positions = [0] * len(templates)
+            
+            # Идентификаторы форматируются для всего блока сразу
+            block_names = [f"sample_{i:06d}" for i in block_ids]
+            
+            for sample_id, template_index in zip(block_names, template_indices.tolist()):
+                template, intent = templates[template_index]
                 
-            except Exception as e:
-                logger.error(f"Ошибка генерации образца {i}: {e}")
-                continue
+                # Берем очередные значения параметров для этого шаблона
+                position = positions[template_index]
+                positions[template_index] += 1
+                parameters = {
+                    name: column[position]
+                    for name, column in parameter_columns[template_index].items()
+                }
+                yield sample_id, template, intent, parameters
+    
+    def _build_samples(self, items: List[Tuple[str, str, str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Построение пачки образцов
+        
+        Сложность кода считается для всей пачки одним вызовом numpy.
+        
+        Args:
+            items: Кортежи (идентификатор, шаблон, намерение, параметры)
+            
+        Returns:
+            Успешно построенные образцы
+        """
+        samples = [sample for sample in (self._build_sample(*item) for item in items) if sample is not None]
+        
+        line_counts = np.fromiter(
+            (sample["generated_code"].count('\n') + 1 for sample in samples),
+            dtype=np.int64, count=len(samples)
+        )
+        for sample, level in zip(samples, _bucket_complexity(line_counts).tolist()):
+            sample["complexity"] = _COMPLEXITY_LABELS[level]
         
-        logger.info(f"Сгенерировано {len(samples)} образцов из {num_samples} попыток")
         return samples
     
+    def _build_sample(self, sample_id: str, template: str, intent: str,
+                      parameters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Построение одного образца по шаблону и параметрам
+        
+        Args:
+            sample_id: Идентификатор образца
+            template: Шаблон описания
+            intent: Намерение
+            parameters: Параметры шаблона
+            
+        Returns:
+            Образец без оценки сложности или None, если код не удалось сгенерировать
+        """
+        # Заполняем шаблон: набор полей проверен в _iter_items
+        description = template.format(**parameters)
+        
+        # Генерируем код; ошибки генератор возвращает как success=False
+        result = self.code_generator.generate_from_natural_language(description)
+        if not result["success"]:
+            return None
+        
+        return {
+            "id": sample_id,
+            "description": description,
+            "intent": intent,
+            "parameters": parameters,
+            "generated_code": result["generated_code"],
+            # Заполняется в _build_samples для всей пачки
+            "complexity": None,
+            "category": self._categorize_intent(intent)
+        }
+    
     def generate_complex_scenarios(self, num_scenarios: int = 100) -> List[Dict[str, Any]]:
         """
         Генерация сложных сценариев
@@ -105,184 +471,158 @@ class DatasetGenerator:
         """
         scenarios = []
         
-        scenario_templates = [
-            # Создание механических деталей
-            "Создай болт с резьбой: создай цилиндр, добавь головку, создай резьбу",
-            "Создай шестерню: создай цилиндр, добавь зубья, создай отверстие",
-            "Создай корпус: создай коробку, вычти внутреннее пространство, добавь отверстия",
+        # Шаблоны всех сценариев выбираются одним вызовом
+        picks = self._rng.integers(0, len(_SCENARIOS), num_scenarios).tolist()
+        scenario_ids = [f"scenario_{i:06d}" for i in range(num_scenarios)]
+        
+        # Шаги и скрипт зависят только от шаблона: каждый выбранный шаблон
+        # генерируется один раз, а не для каждого сценария
+        built = {}
+        for pick in dict.fromkeys(picks):
+            _, _, steps = _SCENARIOS[pick]
             
-            # Архитектурные элементы
-            "Создай колонну: создай цилиндр, добавь капитель, создай базу",
-            "Создай арку: создай полукруг, выдави, добавь опоры",
-            "Создай купол: создай сферу, обрежь нижнюю часть",
+            # Генерируем код для каждого шага; ошибки генератор возвращает как success=False
+            step_codes = []
+            for step in steps:
+                result = self.code_generator.generate_from_natural_language(step)
+                if result["success"]:
+                    step_codes.append({
+                        "description": step,
+                        "code": result["generated_code"]
+                    })
             
-            # Технические детали
-            "Создай подшипник: создай внешнее кольцо, внутреннее кольцо, шарики",
-            "Создай пружину: создай спираль, выдави по траектории",
-            "Создай трубу: создай цилиндр, вычти внутренний цилиндр",
-        ]
+            if step_codes:
+                built[pick] = (step_codes, self._generate_full_script(step_codes))
         
-        for i in range(num_scenarios):
-            try:
-                # Выбираем случайный шаблон
-                scenario_description = random.choice(scenario_templates)
-                
-                # Разбиваем на шаги
-                steps = scenario_description.split(": ")[1].split(", ")
-                
-                # Генерируем код для каждого шага
-                step_codes = []
-                for step in steps:
-                    result = self.code_generator.generate_from_natural_language(step.strip())
-                    if result["success"]:
-                        step_codes.append({
-                            "description": step.strip(),
-                            "code": result["generated_code"]
-                        })
-                
-                if step_codes:
-                    scenario = {
-                        "id": f"scenario_{i:06d}",
-                        "title": scenario_description.split(": ")[0],
-                        "description": scenario_description,
-                        "steps": step_codes,
-                        "full_script": self._generate_full_script(step_codes),
-                        "complexity": "high"
-                    }
-                    scenarios.append(scenario)
-                
-            except Exception as e:
-                logger.error(f"Ошибка генерации сценария {i}: {e}")
+        for i, pick in enumerate(picks):
+            if pick not in built:
                 continue
+            
+            scenario_description, title, _ = _SCENARIOS[pick]
+            step_codes, full_script = built[pick]
+            scenarios.append({
+                "id": scenario_ids[i],
+                "title": title,
+                "description": scenario_description,
+                # Каждому сценарию - собственные копии шагов
+                "steps": [dict(step) for step in step_codes],
+                "full_script": full_script,
+                "complexity": "high"
+            })
         
         return scenarios
     
     def _generate_random_parameters(self, intent: str) -> Dict[str, Any]:
         """Генерация случайных параметров"""
-        parameters = {}
-        
-        if intent == "create_box":
-            parameters = {
-                "length": round(random.uniform(5, 50), 1),
-                "width": round(random.uniform(5, 50), 1),
-                "height": round(random.uniform(5, 50), 1)
-            }
-        elif intent == "create_cylinder":
-            parameters = {
-                "radius": round(random.uniform(2, 20), 1),
-                "height": round(random.uniform(5, 30), 1)
-            }
-        elif intent == "create_sphere":
-            parameters = {
-                "radius": round(random.uniform(2, 15), 1)
-            }
-        elif intent == "create_cone":
-            parameters = {
-                "radius1": round(random.uniform(3, 20), 1),
-                "height": round(random.uniform(5, 25), 1)
-            }
-        elif intent == "create_torus":
-            parameters = {
-                "radius1": round(random.uniform(8, 25), 1),
-                "radius2": round(random.uniform(2, 8), 1)
-            }
-        elif intent == "rotate":
-            parameters = {
-                "angle": random.choice([45, 90, 135, 180, 270]),
-                "axis": random.choice(["X", "Y", "Z"])
-            }
-        elif intent == "translate":
-            parameters = {
-                "distance": round(random.uniform(5, 25), 1),
-                "axis": random.choice(["X", "Y", "Z"])
-            }
-        elif intent == "scale":
-            parameters = {
-                "factor": round(random.uniform(0.5, 3.0), 1)
-            }
-        elif intent == "extrude":
-            parameters = {
-                "distance": round(random.uniform(2, 15), 1)
-            }
-        elif intent == "create_fillet":
-            parameters = {
-                "radius": round(random.uniform(0.5, 3.0), 1)
-            }
-        elif intent == "create_chamfer":
-            parameters = {
-                "distance": round(random.uniform(0.5, 2.0), 1)
-            }
-        
-        return parameters
+        columns = self._sample_parameter_columns(intent, 1)
+        return {name: column[0] for name, column in columns.items()}
     
-    def _calculate_complexity(self, code: str) -> str:
-        """Расчет сложности кода"""
-        lines = len(code.split('\n'))
-        if lines <= 5:
-            return "low"
-        elif lines <= 15:
-            return "medium"
-        else:
-            return "high"
+    def _sample_parameter_columns(self, intent: str, size: int) -> Dict[str, List[Any]]:
+        """
+        Генерация столбцов случайных параметров для нескольких образцов
+        
+        Args:
+            intent: Намерение
+            size: Количество образцов
+            
+        Returns:
+            Словарь параметр -> список значений длины size
+        """
+        columns = {}
+        
+        for name, spec in _PARAMETER_SPECS.get(intent, {}).items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                values = self._rng.uniform(low, high, size).round(1)
+            else:
+                values = self._rng.choice(spec, size)
+            # tolist() возвращает встроенные типы Python вместо numpy скаляров
+            columns[name] = values.tolist()
+        
+        return columns
     
     def _categorize_intent(self, intent: str) -> str:
         """Категоризация намерения"""
-        if intent.startswith("create_"):
-            return "creation"
-        elif intent in ["rotate", "translate", "scale", "extrude"]:
-            return "transformation"
-        elif intent in ["union", "cut", "intersection"]:
-            return "boolean"
-        else:
-            return "other"
+        category = _INTENT_CATEGORY.get(intent)
+        if category is None:
+            category = "creation" if intent.startswith("create_") else "other"
+        return category
     
     def _generate_full_script(self, step_codes: List[Dict[str, Any]]) -> str:
         """Генерация полного скрипта"""
-        script_parts = [
-            "import FreeCAD",
-            "import Part",
-            "import Draft",
-            "",
-            "# Создание документа",
-            "doc = FreeCAD.newDocument('GeneratedDocument')",
-            ""
-        ]
-        
-        for i, step in enumerate(step_codes):
-            script_parts.append(f"# Шаг {i+1}: {step['description']}")
-            script_parts.append(step['code'])
-            script_parts.append("")
-        
-        script_parts.extend([
-            "# Показ документа",
-            "FreeCAD.Gui.SendMsgToActiveView('ViewFit')",
-            "",
-            "print('Скрипт выполнен успешно!')"
-        ])
-        
-        return "\n".join(script_parts)
+        body = "".join(
+            _SCRIPT_STEP.format(i + 1, step["description"], step["code"])
+            for i, step in enumerate(step_codes)
+        )
+        return _SCRIPT_HEADER + body + _SCRIPT_FOOTER
     
-    def save_dataset(self, samples: List[Dict[str, Any]], filepath: str):
+    def save_dataset(self, samples: Iterable[Dict[str, Any]], filepath: str):
         """
-        Сохранение датасета в файл
+        Сохранение датасета в файл формата JSONL
+        
+        Первая строка файла содержит метаданные, каждая следующая - один образец,
+        поэтому датасет не сериализуется в память целиком. Файл с расширением
+        .zst сжимается zstandard.
         
         Args:
             samples: Образцы для сохранения
             filepath: Путь к файлу
         """
-        dataset = {
-            "metadata": {
-                "total_samples": len(samples),
-                "generated_at": str(Path().cwd()),
-                "version": "1.0"
-            },
-            "samples": samples
+        metadata = {
+            "generated_at": str(Path().cwd()),
+            "version": "1.1"
         }
+        if isinstance(samples, Sized):
+            metadata["total_samples"] = len(samples)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        with _open_dataset_file(filepath, 'wb') as f:
+            f.write(orjson.dumps({"metadata": metadata}))
+            f.write(b"\n")
+            for sample in samples:
+                f.write(orjson.dumps(sample, option=orjson.OPT_SERIALIZE_NUMPY))
+                f.write(b"\n")
         
-        logger.info(f"Датасет сохранен: {filepath}")
+        logger.info("Датасет сохранен: %s", filepath)
+    
+    def iter_dataset(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковое чтение датасета из файла
+        
+        Поддерживается формат JSONL и прежний формат JSON-документа
+        с полем samples; последний читается потоково через ijson, если он установлен.
+        Файлы с расширением .zst распаковываются на лету.
+        
+        Args:
+            filepath: Путь к файлу
+            
+        Returns:
+            Итератор по образцам
+        """
+        with _open_dataset_file(filepath, 'rb') as f:
+            first_line = f.readline()
+            try:
+                first_record = orjson.loads(first_line)
+            except orjson.JSONDecodeError:
+                first_record = None
+            
+            if first_record is None:
+                # Многострочный JSON-документ прежнего формата; поток распаковки
+                # .zst не поддерживает seek, поэтому файл открывается заново
+                with _open_dataset_file(filepath, 'rb') as legacy:
+                    yield from _iter_json_samples(legacy)
+                return
+            
+            if "samples" in first_record:
+                # Однострочный JSON-документ прежнего формата
+                yield from first_record["samples"]
+                return
+            
+            if "metadata" not in first_record:
+                yield first_record
+            
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
     
     def load_dataset(self, filepath: str) -> List[Dict[str, Any]]:
         """
@@ -294,10 +634,148 @@ class DatasetGenerator:
         Returns:
             Загруженные образцы
         """
-        with open(filepath, 'r', encoding='utf-8') as f:
-            dataset = json.load(f)
+        return list(self.iter_dataset(filepath))
+    
+    def save_dataset_binary(self, samples: Sequence[Dict[str, Any]], filepath: str):
+        """
+        Сохранение датасета в бинарном формате записей фиксированной длины
+        
+        Категориальные поля кодируются индексами словарей из заголовка,
+        строки образца (id, описание, код и параметры в JSON) пишутся подряд
+        в общий пул, а запись хранит их длины и смещение.
+        
+        Args:
+            samples: Образцы обучающего или валидационного датасета
+            filepath: Путь к файлу
+        """
+        vocab = {
+            field: sorted({sample[field] for sample in samples if field in sample})
+            for field in _BINARY_VOCAB_FIELDS
+        }
+        codes = {field: {value: i for i, value in enumerate(values)} for field, values in vocab.items()}
+        intent_codes, category_codes, complexity_codes = (codes[field] for field in _BINARY_VOCAB_FIELDS)
+        
+        records = np.empty(len(samples), dtype=_BINARY_RECORD)
+        pool = []
+        offset = 0
+        for i, sample in enumerate(samples):
+            sample_id = sample["id"].encode("utf-8")
+            description = sample["description"].encode("utf-8")
+            code = sample.get("generated_code", "").encode("utf-8")
+            # Пустая строка параметров означает, что поля parameters в образце нет
+            parameters = orjson.dumps(sample["parameters"]) if "parameters" in sample else b""
+            records[i] = (
+                intent_codes.get(sample.get("intent"), -1),
+                category_codes.get(sample.get("category"), -1),
+                complexity_codes.get(sample.get("complexity"), -1),
+                len(sample_id), len(description), len(code), len(parameters),
+                offset,
+            )
+            pool += (sample_id, description, code, parameters)
+            offset += len(sample_id) + len(description) + len(code) + len(parameters)
+        
+        header = {
+            "metadata": {"generated_at": str(Path().cwd()), "version": "1.1"},
+            "vocab": vocab,
+            "total_samples": len(samples),
+        }
+        with open(filepath, 'wb') as f:
+            f.write(_BINARY_MAGIC)
+            f.write(orjson.dumps(header))
+            f.write(b"\n")
+            f.write(records.tobytes())
+            f.write(b"".join(pool))
         
-        return dataset.get("samples", [])
+        logger.info("Датасет сохранен в бинарном формате: %s", filepath)
+    
+    def load_dataset_binary(self, filepath: str, indices: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Загрузка датасета, сохраненного save_dataset_binary
+        
+        Файл отображается в память: записи читаются одним np.frombuffer,
+        а строки - срезами пула по смещениям, поэтому выборка отдельных
+        образцов не требует разбора всего файла.
+        
+        Args:
+            filepath: Путь к файлу
+            indices: Номера загружаемых образцов (по умолчанию все)
+            
+        Returns:
+            Загруженные образцы
+        """
+        with open(filepath, 'rb') as f:
+            if f.readline() != _BINARY_MAGIC:
+                raise ValueError(f"Файл не является бинарным датасетом: {filepath}")
+            header = orjson.loads(f.readline())
+            records_offset = f.tell()
+            total = header["total_samples"]
+            if not total:
+                return []
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                records = np.frombuffer(buffer, dtype=_BINARY_RECORD, count=total, offset=records_offset)
+                if indices is not None:
+                    records = records[np.asarray(indices, dtype=np.intp)]
+                rows = records.tolist()
+                # Массив ссылается на буфер и должен быть освобожден до его закрытия
+                del records
+                
+                intents, categories, complexities = (header["vocab"][field] for field in _BINARY_VOCAB_FIELDS)
+                pool_offset = records_offset + total * _BINARY_RECORD.itemsize
+                samples = []
+                for intent, category, complexity, id_len, desc_len, code_len, params_len, offset in rows:
+                    start = pool_offset + offset
+                    desc_start = start + id_len
+                    code_start = desc_start + desc_len
+                    params_start = code_start + code_len
+                    
+                    sample = {
+                        "id": buffer[start:desc_start].decode("utf-8"),
+                        "description": buffer[desc_start:code_start].decode("utf-8"),
+                    }
+                    if intent >= 0:
+                        sample["intent"] = intents[intent]
+                    if params_len:
+                        sample["parameters"] = orjson.loads(buffer[params_start:params_start + params_len])
+                    sample["generated_code"] = buffer[code_start:params_start].decode("utf-8")
+                    if complexity >= 0:
+                        sample["complexity"] = complexities[complexity]
+                    if category >= 0:
+                        sample["category"] = categories[category]
+                    samples.append(sample)
+        
+        return samples
+    
+    def iter_shuffled_batches(self,
+                              filepath: str,
+                              batch_size: int = 32,
+                              fetch_factor: int = 10) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Потоковое чтение датасета перемешанными батчами
+        
+        Из файла читается блок из batch_size * fetch_factor образцов, блок
+        перемешивается в памяти и делится на fetch_factor батчей. Память
+        ограничена размером блока, а батчи разнообразнее, чем при чтении подряд.
+        
+        Args:
+            filepath: Путь к файлу
+            batch_size: Размер батча
+            fetch_factor: Число батчей в одном прочитанном блоке
+            
+        Returns:
+            Итератор по батчам образцов
+        """
+        samples = self.iter_dataset(filepath)
+        block_size = batch_size * fetch_factor
+        
+        while True:
+            block = list(islice(samples, block_size))
+            if not block:
+                return
+            
+            order = self._rng.permutation(len(block)).tolist()
+            for start in range(0, len(order), batch_size):
+                yield [block[i] for i in order[start:start + batch_size]]
     
     def generate_validation_dataset(self, num_samples: int = 100) -> List[Dict[str, Any]]:
         """
@@ -309,33 +787,32 @@ class DatasetGenerator:
         Returns:
             Валидационные образцы
         """
-        # Используем более сложные и разнообразные примеры
-        complex_templates = [
-            "Создай деталь для механизма: коробка 20x15x10, вычти цилиндр радиусом 3, добавь отверстия",
-            "Создай архитектурный элемент: колонна высотой 30, диаметром 5, с капителью",
-            "Создай техническую деталь: подшипник с внешним диаметром 20, внутренним 10",
-            "Создай декоративный элемент: сложная форма из нескольких примитивов",
-        ]
+        complex_templates = _VALIDATION_TEMPLATES
         
         validation_samples = []
         
-        for i in range(num_samples):
-            try:
-                description = random.choice(complex_templates)
-                result = self.code_generator.generate_from_natural_language(description)
-                
-                if result["success"]:
-                    sample = {
-                        "id": f"validation_{i:06d}",
-                        "description": description,
-                        "generated_code": result["generated_code"],
-                        "complexity": "high",
-                        "category": "validation"
-                    }
-                    validation_samples.append(sample)
-                
-            except Exception as e:
-                logger.error(f"Ошибка генерации валидационного образца {i}: {e}")
-                continue
+        # Код для каждого шаблона генерируется один раз
+        results = [
+            self.code_generator.generate_from_natural_language(description)
+            for description in complex_templates
+        ]
+        
+        # Шаблоны всех образцов выбираются одним вызовом
+        picks = self._rng.integers(0, len(complex_templates), num_samples).tolist()
+        sample_ids = [f"validation_{i:06d}" for i in range(num_samples)]
+        
+        for i, pick in enumerate(picks):
+            description = complex_templates[pick]
+            result = results[pick]
+            
+            if result["success"]:
+                sample = {
+                    "id": sample_ids[i],
+                    "description": description,
+                    "generated_code": result["generated_code"],
+                    "complexity": "high",
+                    "category": "validation"
+                }
+                validation_samples.append(sample)
         
         return validation_samples
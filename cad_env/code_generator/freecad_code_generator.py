@@ -3,21 +3,103 @@
 """
 
 import logging
+import re
+from collections import OrderedDict, deque
 from typing import Dict, Any, List, Optional
 from .code_templates import FreeCADTemplates
 
 logger = logging.getLogger(__name__)
 
+# Регулярные выражения для извлечения параметров из описания
+_RE_SIZE = re.compile(r'размером?\s+(\d+(?:\.\d+)?)\s*[xх]\s*(\d+(?:\.\d+)?)(?:\s*[xх]\s*(\d+(?:\.\d+)?))?')
+_RE_RADIUS = re.compile(r'радиусом?\s+(\d+(?:\.\d+)?)')
+_RE_HEIGHT = re.compile(r'высотой?\s+(\d+(?:\.\d+)?)')
+_RE_ANGLE = re.compile(r'(\d+(?:\.\d+)?)\s*градусов?')
+_RE_AXIS = re.compile(r'вокруг\s+оси\s+([xyz])')
+_RE_DISTANCE = re.compile(r'на\s+(\d+(?:\.\d+)?)\s*единиц?')
+
+# Общие начало и конец полного скрипта из нескольких шагов
+_SCRIPT_HEADER = (
+    "import FreeCAD\n"
+    "import Part\n"
+    "import Draft\n"
+    "\n"
+    "# Создание документа\n"
+    "doc = FreeCAD.newDocument('GeneratedDocument')\n"
+    "\n"
+)
+_SCRIPT_FOOTER = (
+    "# Показ документа\n"
+    "FreeCAD.Gui.SendMsgToActiveView('ViewFit')\n"
+    "\n"
+    "print('Скрипт выполнен успешно!')"
+)
+_SCRIPT_STEP = "# Шаг {0}: {1}\n{2}\n\n"
+
+
+def _keywords(*words: str) -> "re.Pattern[str]":
+    """Регулярное выражение, находящее любое из слов как подстроку"""
+    return re.compile("|".join(map(re.escape, words)))
+
+
+# Ключевые слова намерений в порядке приоритета
+_RE_CREATE_VERBS = _keywords("создай", "сделай", "добавь", "построй")
+_CREATE_INTENTS = (
+    ("create_box", _keywords("коробка", "куб", "прямоугольник")),
+    ("create_cylinder", _keywords("цилиндр", "труба")),
+    ("create_sphere", _keywords("сфера", "шар")),
+    ("create_cone", _keywords("конус")),
+    ("create_torus", _keywords("тор", "кольцо")),
+)
+_OTHER_INTENTS = (
+    ("rotate", _keywords("поверни", "поворот")),
+    ("translate", _keywords("перемести", "сдвинь")),
+    ("scale", _keywords("масштабируй", "увеличь", "уменьши")),
+    ("extrude", _keywords("выдави", "вытяни")),
+    ("union", _keywords("объедини", "сложи")),
+    ("cut", _keywords("вычти", "удали")),
+    ("intersection", _keywords("пересечение")),
+)
+
+# Аргументы методов FreeCADTemplates и их значения по умолчанию для каждого намерения
+_CODE_DEFAULTS = {
+    "create_box": {"length": 10, "width": 10, "height": 10},
+    "create_cylinder": {"radius": 5, "height": 10},
+    "create_sphere": {"radius": 5},
+    "create_cone": {"radius1": 5, "radius2": 0, "height": 10},
+    "create_torus": {"radius1": 10, "radius2": 3},
+    "rotate": {"angle": 90, "axis": "Z"},
+    "translate": {"x": 0, "y": 0, "z": 0},
+    "scale": {"factor": 2},
+    "extrude": {"distance": 5},
+    "union": {},
+    "cut": {},
+    "intersection": {},
+}
+
 
 class FreeCADCodeGenerator:
     """
     Генератор FreeCAD Python кода для LLM
     """
     
-    def __init__(self):
-        """Инициализация генератора"""
+    def __init__(self, cache_size: int = 4096, history_size: int = 10_000,
+                 enable_history: bool = True):
+        """
+        Инициализация генератора
+        
+        Args:
+            cache_size: Размер кэшей результатов по описанию и по структурированному
+                запросу (0 - без кэша)
+            history_size: Сколько последних результатов хранить в истории
+            enable_history: Вести историю генерации
+        """
         self.templates = FreeCADTemplates()
-        self.generated_code_history = []
+        self.generated_code_history = deque(maxlen=history_size)
+        self.enable_history = enable_history
+        self.cache_size = cache_size
+        self._gen_cache = OrderedDict()
+        self._structured_cache = OrderedDict()
     
     def generate_from_natural_language(self, description: str) -> Dict[str, Any]:
         """
@@ -29,6 +111,15 @@ class FreeCADCodeGenerator:
         Returns:
             Словарь с сгенерированным кодом и метаданными
         """
+        # Результат зависит только от описания, повторы берем из кэша
+        cached = self._gen_cache.get(description)
+        if cached is not None:
+            self._gen_cache.move_to_end(description)
+            result = dict(cached, parameters=dict(cached["parameters"]))
+            if self.enable_history:
+                self.generated_code_history.append(result)
+            return result
+        
         try:
             # Анализ описания
             intent = self._analyze_intent(description)
@@ -46,13 +137,20 @@ class FreeCADCodeGenerator:
                 "executable": True
             }
             
-            self.generated_code_history.append(result)
-            logger.info(f"Сгенерирован код для: {description}")
+            if self.enable_history:
+                self.generated_code_history.append(result)
+            # Сообщение на каждый вызов: только на уровне DEBUG и без форматирования заранее
+            logger.debug("Сгенерирован код для: %s", description)
+            
+            if self.cache_size > 0:
+                self._gen_cache[description] = dict(result, parameters=dict(parameters))
+                if len(self._gen_cache) > self.cache_size:
+                    self._gen_cache.popitem(last=False)
             
             return result
             
         except Exception as e:
-            logger.error(f"Ошибка генерации кода: {e}")
+            logger.error("Ошибка генерации кода: %s", e)
             return {
                 "success": False,
                 "description": description,
@@ -77,7 +175,23 @@ class FreeCADCodeGenerator:
             if not action:
                 raise ValueError("Не указано действие")
             
-            code = self._generate_code(action, parameters)
+            # Код зависит только от действия и параметров; ключ - их неизменяемая копия.
+            # Тип значения входит в ключ: 10 и 10.0 дают разный код
+            try:
+                key = (action, tuple(sorted((k, type(v), v) for k, v in parameters.items())))
+                hash(key)
+            except TypeError:
+                key = None
+            
+            code = self._structured_cache.get(key) if key is not None else None
+            if code is not None:
+                self._structured_cache.move_to_end(key)
+            else:
+                code = self._generate_code(action, parameters)
+                if key is not None and self.cache_size > 0:
+                    self._structured_cache[key] = code
+                    if len(self._structured_cache) > self.cache_size:
+                        self._structured_cache.popitem(last=False)
             
             return {
                 "success": True,
@@ -99,47 +213,26 @@ class FreeCADCodeGenerator:
         description = description.lower()
         
         # Создание объектов
-        if any(word in description for word in ["создай", "сделай", "добавь", "построй"]):
-            if any(word in description for word in ["коробка", "куб", "прямоугольник"]):
-                return "create_box"
-            elif any(word in description for word in ["цилиндр", "труба"]):
-                return "create_cylinder"
-            elif any(word in description for word in ["сфера", "шар"]):
-                return "create_sphere"
-            elif any(word in description for word in ["конус"]):
-                return "create_cone"
-            elif any(word in description for word in ["тор", "кольцо"]):
-                return "create_torus"
+        if _RE_CREATE_VERBS.search(description):
+            for intent, pattern in _CREATE_INTENTS:
+                if pattern.search(description):
+                    return intent
+            return "unknown"
         
-        # Трансформации
-        elif any(word in description for word in ["поверни", "поворот"]):
-            return "rotate"
-        elif any(word in description for word in ["перемести", "сдвинь"]):
-            return "translate"
-        elif any(word in description for word in ["масштабируй", "увеличь", "уменьши"]):
-            return "scale"
-        elif any(word in description for word in ["выдави", "вытяни"]):
-            return "extrude"
-        
-        # Булевы операции
-        elif any(word in description for word in ["объедини", "сложи"]):
-            return "union"
-        elif any(word in description for word in ["вычти", "удали"]):
-            return "cut"
-        elif any(word in description for word in ["пересечение"]):
-            return "intersection"
+        # Трансформации и булевы операции
+        for intent, pattern in _OTHER_INTENTS:
+            if pattern.search(description):
+                return intent
         
         return "unknown"
     
     def _extract_parameters(self, description: str) -> Dict[str, Any]:
         """Извлечение параметров из описания"""
-        import re
-        
         parameters = {}
         description = description.lower()
         
         # Размеры
-        size_match = re.search(r'размером?\s+(\d+(?:\.\d+)?)\s*[xх]\s*(\d+(?:\.\d+)?)(?:\s*[xх]\s*(\d+(?:\.\d+)?))?', description)
+        size_match = _RE_SIZE.search(description)
         if size_match:
             dims = [float(d) for d in size_match.groups() if d]
             if len(dims) >= 2:
@@ -151,27 +244,27 @@ class FreeCADCodeGenerator:
                     parameters["height"] = dims[1]
         
         # Радиус
-        radius_match = re.search(r'радиусом?\s+(\d+(?:\.\d+)?)', description)
+        radius_match = _RE_RADIUS.search(description)
         if radius_match:
             parameters["radius"] = float(radius_match.group(1))
         
         # Высота
-        height_match = re.search(r'высотой?\s+(\d+(?:\.\d+)?)', description)
+        height_match = _RE_HEIGHT.search(description)
         if height_match:
             parameters["height"] = float(height_match.group(1))
         
         # Угол поворота
-        angle_match = re.search(r'(\d+(?:\.\d+)?)\s*градусов?', description)
+        angle_match = _RE_ANGLE.search(description)
         if angle_match:
             parameters["angle"] = float(angle_match.group(1))
         
         # Ось поворота
-        axis_match = re.search(r'вокруг\s+оси\s+([xyz])', description)
+        axis_match = _RE_AXIS.search(description)
         if axis_match:
             parameters["axis"] = axis_match.group(1).upper()
         
         # Расстояние перемещения
-        distance_match = re.search(r'на\s+(\d+(?:\.\d+)?)\s*единиц?', description)
+        distance_match = _RE_DISTANCE.search(description)
         if distance_match:
             parameters["distance"] = float(distance_match.group(1))
         
@@ -179,76 +272,17 @@ class FreeCADCodeGenerator:
     
     def _generate_code(self, intent: str, parameters: Dict[str, Any]) -> str:
         """Генерация FreeCAD Python кода"""
-        
-        if intent == "create_box":
-            return self.templates.create_box(
-                length=parameters.get("length", 10),
-                width=parameters.get("width", 10),
-                height=parameters.get("height", 10)
-            )
-        
-        elif intent == "create_cylinder":
-            return self.templates.create_cylinder(
-                radius=parameters.get("radius", 5),
-                height=parameters.get("height", 10)
-            )
-        
-        elif intent == "create_sphere":
-            return self.templates.create_sphere(
-                radius=parameters.get("radius", 5)
-            )
-        
-        elif intent == "create_cone":
-            return self.templates.create_cone(
-                radius1=parameters.get("radius1", 5),
-                radius2=parameters.get("radius2", 0),
-                height=parameters.get("height", 10)
-            )
-        
-        elif intent == "create_torus":
-            return self.templates.create_torus(
-                radius1=parameters.get("radius1", 10),
-                radius2=parameters.get("radius2", 3)
-            )
-        
-        elif intent == "rotate":
-            return self.templates.rotate(
-                angle=parameters.get("angle", 90),
-                axis=parameters.get("axis", "Z")
-            )
-        
-        elif intent == "translate":
-            return self.templates.translate(
-                x=parameters.get("x", 0),
-                y=parameters.get("y", 0),
-                z=parameters.get("z", 0)
-            )
-        
-        elif intent == "scale":
-            return self.templates.scale(
-                factor=parameters.get("factor", 2)
-            )
-        
-        elif intent == "extrude":
-            return self.templates.extrude(
-                distance=parameters.get("distance", 5)
-            )
-        
-        elif intent == "union":
-            return self.templates.union()
-        
-        elif intent == "cut":
-            return self.templates.cut()
-        
-        elif intent == "intersection":
-            return self.templates.intersection()
-        
-        else:
+        defaults = _CODE_DEFAULTS.get(intent)
+        if defaults is None:
             return f"# Неизвестная команда: {intent}\n# Параметры: {parameters}"
+        
+        # Имя намерения совпадает с именем метода шаблонов
+        arguments = {name: parameters.get(name, default) for name, default in defaults.items()}
+        return getattr(self.templates, intent)(**arguments)
     
     def get_generation_history(self) -> List[Dict[str, Any]]:
         """Получить историю генерации кода"""
-        return self.generated_code_history.copy()
+        return list(self.generated_code_history)
     
     def generate_complex_script(self, descriptions: List[str]) -> str:
         """
@@ -260,28 +294,13 @@ class FreeCADCodeGenerator:
         Returns:
             Полный FreeCAD скрипт
         """
-        script_parts = [
-            "import FreeCAD",
-            "import Part",
-            "import Draft",
-            "",
-            "# Создание документа",
-            "doc = FreeCAD.newDocument('GeneratedDocument')",
-            ""
-        ]
-        
-        for i, description in enumerate(descriptions):
-            result = self.generate_from_natural_language(description)
-            if result["success"]:
-                script_parts.append(f"# Шаг {i+1}: {description}")
-                script_parts.append(result["generated_code"])
-                script_parts.append("")
-        
-        script_parts.extend([
-            "# Показ документа",
-            "FreeCAD.Gui.SendMsgToActiveView('ViewFit')",
-            "",
-            "print('Скрипт выполнен успешно!')"
-        ])
-        
-        return "\n".join(script_parts)
+        results = (
+            (description, self.generate_from_natural_language(description))
+            for description in descriptions
+        )
+        body = "".join(
+            _SCRIPT_STEP.format(i + 1, description, result["generated_code"])
+            for i, (description, result) in enumerate(results)
+            if result["success"]
+        )
+        return _SCRIPT_HEADER + body + _SCRIPT_FOOTER
@@ -0,0 +1,115 @@
+"""
+Постоянный процесс-исполнитель FreeCAD кода
+
+Скрипт запускается один раз командой `freecad -c freecad_worker.py` и
+выполняет блоки кода, получаемые через stdin, без повторного запуска FreeCAD.
+Модуль не зависит от cad_env: внутри FreeCAD пакет может быть не установлен.
+
+Протокол: каждое сообщение - строка заголовка `@@cad_env@@{"len": N}`,
+за которой следуют N байт данных. Запрос содержит код в UTF-8, ответ -
+JSON с полями output, error_output и return_code.
+"""
+
+import contextlib
+import io
+import json
+import os
+import traceback
+from typing import BinaryIO, Optional
+
+FRAME_MARKER = b"@@cad_env@@"
+
+
+def read_frame(stream: BinaryIO) -> Optional[bytes]:
+    """
+    Прочитать сообщение из потока
+
+    Строки без маркера (например, вывод самого FreeCAD) пропускаются.
+
+    Args:
+        stream: Бинарный поток
+
+    Returns:
+        Данные сообщения или None, если поток закрыт
+    """
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+
+        position = line.find(FRAME_MARKER)
+        if position < 0:
+            continue
+
+        header = json.loads(line[position + len(FRAME_MARKER):])
+        payload = stream.read(header["len"])
+        if len(payload) < header["len"]:
+            return None
+        return payload
+
+
+def write_frame(stream: BinaryIO, payload: bytes):
+    """
+    Записать сообщение в поток
+
+    Args:
+        stream: Бинарный поток
+        payload: Данные сообщения
+    """
+    header = json.dumps({"len": len(payload)}).encode("ascii")
+    stream.write(FRAME_MARKER + header + b"\n" + payload)
+    stream.flush()
+
+
+def _run_code(freecad, code: str) -> dict:
+    """Выполнить код в чистом пространстве имен с новым документом"""
+    output = io.StringIO()
+    error_output = io.StringIO()
+    return_code = 0
+
+    documents_before = set(freecad.listDocuments())
+    namespace = {
+        "__name__": "__main__",
+        "FreeCAD": freecad,
+        "doc": freecad.newDocument("WorkerDocument"),
+    }
+
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(error_output):
+        try:
+            exec(compile(code, "<cad_env>", "exec"), namespace)
+        except SystemExit as e:
+            return_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            return_code = 1
+
+    # Закрываем документы, созданные этим блоком кода
+    for name in set(freecad.listDocuments()) - documents_before:
+        freecad.closeDocument(name)
+
+    return {
+        "output": output.getvalue(),
+        "error_output": error_output.getvalue(),
+        "return_code": return_code,
+    }
+
+
+def main():
+    """Цикл обработки запросов"""
+    import FreeCAD
+
+    # Собственные копии дескрипторов: FreeCAD может подменять sys.stdin/sys.stdout
+    requests = os.fdopen(os.dup(0), "rb")
+    responses = os.fdopen(os.dup(1), "wb")
+
+    while True:
+        payload = read_frame(requests)
+        if payload is None:
+            break
+
+        result = _run_code(FreeCAD, payload.decode("utf-8"))
+        write_frame(responses, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@
 
 import os
 import logging
-from typing import Dict, Any, Optional, List
+from collections import deque
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 from pathlib import Path
 
 from .freecad_wrapper import FreeCADWrapper
@@ -23,12 +24,14 @@ class CADEnvironment:
         Инициализация CAD окружения
         
         Args:
-            config: Конфигурация окружения
+            config: Конфигурация окружения. Ключи history_max (сколько последних
+                операций хранить) и enable_history (вести ли историю) необязательны
         """
         self.config = config or {}
         self.freecad = FreeCADWrapper()
         self.current_document = None
-        self.history = []
+        self.history = deque(maxlen=self.config.get("history_max", 10_000))
+        self._history_enabled = self.config.get("enable_history", True)
         
         # Настройка логирования
         logging.basicConfig(level=logging.INFO)
@@ -46,11 +49,12 @@ class CADEnvironment:
         try:
             doc_id = self.freecad.create_document(name)
             self.current_document = doc_id
-            self.history.append({"action": "create_document", "name": name, "doc_id": doc_id})
-            logger.info(f"Создан документ: {name} (ID: {doc_id})")
+            if self._history_enabled:
+                self.history.append({"action": "create_document", "name": name, "doc_id": doc_id})
+            logger.info("Создан документ: %s (ID: %s)", name, doc_id)
             return doc_id
         except Exception as e:
-            logger.error(f"Ошибка создания документа: {e}")
+            logger.error("Ошибка создания документа: %s", e)
             raise
     
     def save_document(self, filepath: str) -> bool:
@@ -66,11 +70,12 @@ class CADEnvironment:
         try:
             success = self.freecad.save_document(self.current_document, filepath)
             if success:
-                self.history.append({"action": "save_document", "filepath": filepath})
-                logger.info(f"Документ сохранен: {filepath}")
+                if self._history_enabled:
+                    self.history.append({"action": "save_document", "filepath": filepath})
+                logger.info("Документ сохранен: %s", filepath)
             return success
         except Exception as e:
-            logger.error(f"Ошибка сохранения документа: {e}")
+            logger.error("Ошибка сохранения документа: %s", e)
             return False
     
     def load_document(self, filepath: str) -> str:
@@ -86,11 +91,12 @@ class CADEnvironment:
         try:
             doc_id = self.freecad.load_document(filepath)
             self.current_document = doc_id
-            self.history.append({"action": "load_document", "filepath": filepath, "doc_id": doc_id})
-            logger.info(f"Документ загружен: {filepath} (ID: {doc_id})")
+            if self._history_enabled:
+                self.history.append({"action": "load_document", "filepath": filepath, "doc_id": doc_id})
+            logger.info("Документ загружен: %s (ID: %s)", filepath, doc_id)
             return doc_id
         except Exception as e:
-            logger.error(f"Ошибка загрузки документа: {e}")
+            logger.error("Ошибка загрузки документа: %s", e)
             raise
     
     def get_document_info(self) -> Dict[str, Any]:
@@ -105,6 +111,20 @@ class CADEnvironment:
         
         return self.freecad.get_document_info(self.current_document)
     
+    def document_name(self) -> Optional[str]:
+        """
+        Получить имя текущего документа
+        
+        В отличие от get_document_info, список объектов документа не собирается.
+        
+        Returns:
+            Имя документа или None, если активного документа нет
+        """
+        if not self.current_document:
+            return None
+        
+        return self.freecad.get_document_name(self.current_document)
+    
     def execute_command(self, command: str, **kwargs) -> Dict[str, Any]:
         """
         Выполнить CAD команду
@@ -118,18 +138,51 @@ class CADEnvironment:
         """
         try:
             result = self.freecad.execute_command(command, **kwargs)
-            self.history.append({
-                "action": "execute_command", 
-                "command": command, 
-                "kwargs": kwargs,
-                "result": result
-            })
-            logger.info(f"Выполнена команда: {command}")
+            if self._history_enabled:
+                self.history.append({
+                    "action": "execute_command", 
+                    "command": command, 
+                    "kwargs": kwargs,
+                    "result": result
+                })
+            logger.info("Выполнена команда: %s", command)
             return result
         except Exception as e:
-            logger.error(f"Ошибка выполнения команды {command}: {e}")
+            logger.error("Ошибка выполнения команды %s: %s", command, e)
             raise
     
+    def execute_commands(self, commands: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Выполнить несколько CAD команд подряд
+        
+        В отличие от execute_command, ошибка одной команды не прерывает
+        выполнение остальных и возвращается в ее результате. Команды
+        выполняются одной транзакцией FreeCAD с одним пересчетом документа.
+        
+        Args:
+            commands: Пары (команда, параметры)
+            
+        Returns:
+            Результаты выполнения в порядке команд
+        """
+        try:
+            results = self.freecad.execute_commands(commands)
+        except Exception as e:
+            logger.error("Ошибка пакетного выполнения команд: %s", e)
+            return [{"success": False, "error": str(e)} for _ in commands]
+        
+        if self._history_enabled:
+            for (command, kwargs), result in zip(commands, results):
+                self.history.append({
+                    "action": "execute_command",
+                    "command": command,
+                    "kwargs": kwargs,
+                    "result": result
+                })
+        
+        logger.info("Выполнено команд: %d", len(commands))
+        return results
+    
     def get_history(self) -> List[Dict[str, Any]]:
         """
         Получить историю операций
@@ -137,7 +190,28 @@ class CADEnvironment:
         Returns:
             Список операций
         """
-        return self.history.copy()
+        return list(self.history)
+    
+    def get_history_iter(self) -> Iterator[Dict[str, Any]]:
+        """
+        Получить итератор по истории операций
+        
+        Итерация идет по снимку: deque не допускает изменения во время обхода,
+        а история может пополняться, пока ответ еще отправляется.
+        
+        Returns:
+            Итератор операций
+        """
+        return iter(tuple(self.history))
+    
+    def get_history_count(self) -> int:
+        """
+        Получить число операций в истории без копирования истории
+        
+        Returns:
+            Число операций
+        """
+        return len(self.history)
     
     def reset(self):
         """
@@ -145,6 +219,6 @@ class CADEnvironment:
         """
         self.freecad.reset()
         self.current_document = None
-        self.history = []
+        self.history.clear()
         logger.info("Окружение сброшено")
 
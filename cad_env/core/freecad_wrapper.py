@@ -5,17 +5,50 @@
 import os
 import sys
 import logging
-from typing import Dict, Any, Optional, List
+import functools
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Функции модуля FreeCAD, доступные через execute_command
+ALLOWED_FREECAD_COMMANDS = (
+    "newDocument",
+    "openDocument",
+    "closeDocument",
+    "getDocument",
+    "listDocuments",
+    "setActiveDocument",
+    "activeDocument",
+    "Version",
+)
+
+# Заголовок файла документа в режиме симуляции
+_SIMULATION_HEADER = b"# FreeCAD simulation document: "
+
+
+@functools.lru_cache(maxsize=None)
+def _load_freecad():
+    """
+    Импортировать модуль FreeCAD один раз на процесс
+    
+    Returns:
+        Модуль FreeCAD или None, если он не установлен
+    """
+    try:
+        import FreeCAD
+        return FreeCAD
+    except ImportError:
+        return None
+
 
 class FreeCADWrapper:
     """
     Обертка для работы с FreeCAD API
     """
     
+    __slots__ = ("freecad", "documents", "current_doc", "_dispatch")
+    
     def __init__(self):
         """
         Инициализация FreeCAD
@@ -23,18 +56,24 @@ class FreeCADWrapper:
         self.freecad = None
         self.documents = {}
         self.current_doc = None
+        self._dispatch = {}
         self._init_freecad()
     
     def _init_freecad(self):
         """
         Инициализация FreeCAD
         """
-        try:
-            # Попытка импорта FreeCAD
-            import FreeCAD
+        # Результат импорта общий для всех оберток процесса
+        FreeCAD = _load_freecad()
+        if FreeCAD is not None:
             self.freecad = FreeCAD
+            self._dispatch = {
+                name: getattr(FreeCAD, name)
+                for name in ALLOWED_FREECAD_COMMANDS
+                if hasattr(FreeCAD, name)
+            }
             logger.info("FreeCAD успешно инициализирован")
-        except ImportError:
+        else:
             logger.warning("FreeCAD не найден. Используется режим симуляции.")
             self.freecad = None
     
@@ -81,9 +120,11 @@ class FreeCADWrapper:
             return True
         else:
             # Режим симуляции - создаем пустой файл
-            Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"# FreeCAD simulation document: {self.documents[doc_id]['name']}\n")
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(filepath, 'wb') as f:
+                f.write(_SIMULATION_HEADER + self.documents[doc_id]['name'].encode('utf-8') + b"\n")
             return True
     
     def load_document(self, filepath: str) -> str:
@@ -123,18 +164,17 @@ class FreeCADWrapper:
         Returns:
             Информация о документе
         """
-        if doc_id not in self.documents:
+        doc = self.documents.get(doc_id)
+        if doc is None:
             return {"error": "Документ не найден"}
         
         if self.freecad:
-            doc = self.documents[doc_id]
             return {
                 "name": doc.Name,
                 "objects": [obj.Name for obj in doc.Objects],
                 "count": len(doc.Objects)
             }
         else:
-            doc = self.documents[doc_id]
             return {
                 "name": doc["name"],
                 "objects": doc["objects"],
@@ -142,6 +182,21 @@ class FreeCADWrapper:
                 "simulation": True
             }
     
+    def get_document_name(self, doc_id: str) -> Optional[str]:
+        """
+        Получить имя документа без сбора списка его объектов
+        
+        Args:
+            doc_id: ID документа
+            
+        Returns:
+            Имя документа или None, если документ не найден
+        """
+        doc = self.documents.get(doc_id)
+        if doc is None:
+            return None
+        return doc.Name if self.freecad else doc["name"]
+    
     def execute_command(self, command: str, **kwargs) -> Dict[str, Any]:
         """
         Выполнить команду FreeCAD
@@ -156,10 +211,53 @@ class FreeCADWrapper:
         if not self.current_doc:
             return {"error": "Нет активного документа"}
         
+        return self._run_command(command, kwargs)
+    
+    def execute_commands(self, commands: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Выполнить несколько команд FreeCAD одной транзакцией
+        
+        Документ пересчитывается один раз после всех команд, а не после каждой.
+        
+        Args:
+            commands: Пары (команда, параметры)
+            
+        Returns:
+            Результаты выполнения в порядке команд
+        """
+        if not self.current_doc:
+            return [{"error": "Нет активного документа"} for _ in commands]
+        
+        if not self.freecad:
+            return [self._run_command(command, kwargs) for command, kwargs in commands]
+        
+        doc = self.documents[self.current_doc]
+        doc.openTransaction("batch")
+        try:
+            return [self._run_command(command, kwargs) for command, kwargs in commands]
+        finally:
+            doc.commitTransaction()
+            doc.recompute()
+    
+    def _run_command(self, command: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполнить одну команду без проверки активного документа
+        
+        Args:
+            command: Команда
+            kwargs: Параметры
+            
+        Returns:
+            Результат выполнения
+        """
         if self.freecad:
+            function = self._dispatch.get(command)
+            if function is None:
+                return {"success": False, "error": f"Неизвестная команда: {command}"}
+            
             try:
                 # Выполнение команды через FreeCAD
-                result = eval(f"self.freecad.{command}", {"self": self, "freecad": self.freecad}, kwargs)
+                result = function(**kwargs)
                 return {"success": True, "result": str(result)}
             except Exception as e:
                 return {"success": False, "error": str(e)}
@@ -175,10 +273,10 @@ class FreeCADWrapper:
         """
         Сбросить состояние
         """
-        self.documents = {}
+        self.documents.clear()
         self.current_doc = None
         if self.freecad:
-            # Закрыть все документы
-            for doc in self.freecad.listDocuments().values():
-                self.freecad.closeDocument(doc.Name)
+            # Закрыть все документы; ключи listDocuments - имена документов
+            for name in self.freecad.listDocuments():
+                self.freecad.closeDocument(name)
 
@@ -2,57 +2,222 @@
 Парсер команд для LLM интерфейса
 """
 
-import re
+import functools
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+
+# Модуль regex совместим с re и лучше работает с кириллицей в Unicode
+try:
+    import regex as re
+except ImportError:
+    import re
 
 logger = logging.getLogger(__name__)
 
+# Паттерны команд
+_RAW_COMMAND_PATTERNS = {
+    "create_box": [
+        r"создай?\s+(?:коробку|прямоугольник|куб|параллелепипед)",
+        r"сделай?\s+(?:коробку|прямоугольник|куб|параллелепипед)",
+        r"добавь?\s+(?:коробку|прямоугольник|куб|параллелепипед)"
+    ],
+    "create_cylinder": [
+        r"создай?\s+цилиндр",
+        r"сделай?\s+цилиндр",
+        r"добавь?\s+цилиндр"
+    ],
+    "create_sphere": [
+        r"создай?\s+сферу",
+        r"сделай?\s+сферу",
+        r"добавь?\s+сферу"
+    ],
+    "extrude": [
+        r"выдави?\s+(?:на\s+)?(\d+(?:\.\d+)?)",
+        r"вытяни?\s+(?:на\s+)?(\d+(?:\.\d+)?)"
+    ],
+    "rotate": [
+        r"поверни?\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*градусов?\s*(?:вокруг\s+оси\s+)?([xyz])?",
+        r"поворот\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*градусов?"
+    ],
+    "translate": [
+        r"перемести?\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*(?:единиц?\s+)?(?:по\s+оси\s+)?([xyz])",
+        r"сдвинь?\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*(?:единиц?\s+)?(?:по\s+оси\s+)?([xyz])"
+    ]
+}
+
+# Паттерны параметров команд
+_RAW_PARAMETER_PATTERNS = {
+    "dimensions": r"размером?\s+(\d+(?:\.\d+)?)\s*[xх]\s*(\d+(?:\.\d+)?)(?:\s*[xх]\s*(\d+(?:\.\d+)?))?",
+    "radius": r"радиусом?\s+(\d+(?:\.\d+)?)",
+    "height": r"высотой?\s+(\d+(?:\.\d+)?)",
+    "length": r"длиной?\s+(\d+(?:\.\d+)?)",
+    "width": r"шириной?\s+(\d+(?:\.\d+)?)"
+}
+
+
+
+def _fuse_patterns(patterns: List[str]) -> Tuple["re.Pattern[str]", Dict[str, Tuple[int, int]]]:
+    """
+    Объединение альтернативных паттернов команды в одно выражение
+    
+    Каждая альтернатива оборачивается в именованную группу, по имени которой
+    (match.lastgroup) находятся номера ее собственных групп.
+    
+    Args:
+        patterns: Паттерны команды
+        
+    Returns:
+        Скомпилированное выражение и словарь имя альтернативы -> (номер первой группы, число групп)
+    """
+    parts = []
+    spans = {}
+    group_count = 0
+    for i, pattern in enumerate(patterns):
+        name = f"alt{i}"
+        inner_count = re.compile(pattern).groups
+        spans[name] = (group_count + 2, inner_count)
+        parts.append(f"(?P<{name}>{pattern})")
+        group_count += inner_count + 1
+    return re.compile("|".join(parts), re.IGNORECASE), spans
+
+
+# Паттерны компилируются один раз при импорте модуля: по одному выражению на команду,
+# команды проверяются в порядке приоритета
+_COMMAND_PATTERNS = {
+    command: _fuse_patterns(patterns)
+    for command, patterns in _RAW_COMMAND_PATTERNS.items()
+}
+_PARAMETER_PATTERNS = {
+    name: re.compile(pattern, re.IGNORECASE)
+    for name, pattern in _RAW_PARAMETER_PATTERNS.items()
+}
+# Радиус и высота цилиндра за один проход по тексту; имя группы - имя параметра
+_RE_CYLINDER_PARAMS = re.compile(
+    r"радиусом?\s+(?P<radius>\d+(?:\.\d+)?)|высотой?\s+(?P<height>\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+
+# Обязательные параметры команд
+_REQUIRED_PARAMS = {
+    "create_box": frozenset(("length", "width", "height")),
+    "create_cylinder": frozenset(("radius", "height")),
+    "create_sphere": frozenset(("radius",)),
+    "extrude": frozenset(("distance",)),
+    "rotate": frozenset(("angle",)),
+}
+_TRANSLATE_AXES = frozenset(("x", "y", "z"))
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_command(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Поиск команды в тексте; результат зависит только от текста и кэшируется
+    
+    Args:
+        text: Текст без пробелов по краям
+        
+    Returns:
+        Структурированная команда или None
+    """
+    for command, (pattern, spans) in _COMMAND_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            first, count = spans[match.lastgroup]
+            groups = tuple(match.group(i) for i in range(first, first + count))
+            return _build_command(command, text, groups)
+    
+    return None
+
+
+def _build_command(command: str, text: str, groups: tuple) -> Dict[str, Any]:
+    """
+    Построить структурированную команду
+    
+    Args:
+        command: Тип команды
+        text: Исходный текст
+        groups: Группы из регулярного выражения
+    
+    Returns:
+        Структурированная команда
+    """
+    parameters = {}
+    
+    if command == "create_box":
+        # Поиск размеров
+        dim_match = _PARAMETER_PATTERNS["dimensions"].search(text)
+        if dim_match:
+            dims = [float(d) for d in dim_match.groups() if d]
+            if len(dims) >= 2:
+                parameters["length"] = dims[0]
+                parameters["width"] = dims[1]
+                if len(dims) >= 3:
+                    parameters["height"] = dims[2]
+                else:
+                    parameters["height"] = dims[1]  # По умолчанию
+    
+    elif command == "create_cylinder":
+        # Поиск радиуса и высоты; учитывается первое упоминание каждого параметра
+        found = {}
+        for match in _RE_CYLINDER_PARAMS.finditer(text):
+            name = match.lastgroup
+            if name not in found:
+                found[name] = float(match.group(name))
+                if len(found) == 2:
+                    break
+        
+        # Порядок параметров - радиус, затем высота, независимо от порядка в тексте
+        for name in ("radius", "height"):
+            if name in found:
+                parameters[name] = found[name]
+    
+    elif command == "create_sphere":
+        # Поиск радиуса
+        radius_match = _PARAMETER_PATTERNS["radius"].search(text)
+        if radius_match:
+            parameters["radius"] = float(radius_match.group(1))
+    
+    elif command == "extrude":
+        # Извлечение расстояния из групп
+        if groups and groups[0]:
+            parameters["distance"] = float(groups[0])
+    
+    elif command == "rotate":
+        # Извлечение угла и оси
+        if groups:
+            if groups[0]:
+                parameters["angle"] = float(groups[0])
+            if len(groups) > 1 and groups[1]:
+                parameters["axis"] = groups[1].upper()
+            else:
+                parameters["axis"] = "Z"  # По умолчанию
+    
+    elif command == "translate":
+        # Извлечение расстояния и оси
+        if groups:
+            if groups[0]:
+                distance = float(groups[0])
+                axis = groups[1].upper() if len(groups) > 1 and groups[1] else "X"
+                parameters[axis.lower()] = distance
+    
+    return {
+        "action": command,
+        "parameters": parameters,
+        "original_text": text
+    }
+
 
 class CommandParser:
     """
     Парсер команд из естественного языка
     """
     
+    __slots__ = ("command_patterns", "parameter_patterns")
+    
     def __init__(self):
         """Инициализация парсера"""
-        self.command_patterns = {
-            "create_box": [
-                r"создай?\s+(?:коробку|прямоугольник|куб|параллелепипед)",
-                r"сделай?\s+(?:коробку|прямоугольник|куб|параллелепипед)",
-                r"добавь?\s+(?:коробку|прямоугольник|куб|параллелепипед)"
-            ],
-            "create_cylinder": [
-                r"создай?\s+цилиндр",
-                r"сделай?\s+цилиндр",
-                r"добавь?\s+цилиндр"
-            ],
-            "create_sphere": [
-                r"создай?\s+сферу",
-                r"сделай?\s+сферу",
-                r"добавь?\s+сферу"
-            ],
-            "extrude": [
-                r"выдави?\s+(?:на\s+)?(\d+(?:\.\d+)?)",
-                r"вытяни?\s+(?:на\s+)?(\d+(?:\.\d+)?)"
-            ],
-            "rotate": [
-                r"поверни?\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*градусов?\s*(?:вокруг\s+оси\s+)?([xyz])?",
-                r"поворот\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*градусов?"
-            ],
-            "translate": [
-                r"перемести?\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*(?:единиц?\s+)?(?:по\s+оси\s+)?([xyz])",
-                r"сдвинь?\s+(?:на\s+)?(\d+(?:\.\d+)?)\s*(?:единиц?\s+)?(?:по\s+оси\s+)?([xyz])"
-            ]
-        }
-        
-        self.parameter_patterns = {
-            "dimensions": r"размером?\s+(\d+(?:\.\d+)?)\s*[xх]\s*(\d+(?:\.\d+)?)(?:\s*[xх]\s*(\d+(?:\.\d+)?))?",
-            "radius": r"радиусом?\s+(\d+(?:\.\d+)?)",
-            "height": r"высотой?\s+(\d+(?:\.\d+)?)",
-            "length": r"длиной?\s+(\d+(?:\.\d+)?)",
-            "width": r"шириной?\s+(\d+(?:\.\d+)?)"
-        }
+        self.command_patterns = _COMMAND_PATTERNS
+        self.parameter_patterns = _PARAMETER_PATTERNS
     
     def parse_natural_language(self, text: str, intent: str) -> Optional[Dict[str, Any]]:
         """
@@ -65,88 +230,41 @@ class CommandParser:
         Returns:
             Структурированная команда или None
         """
-        text = text.lower().strip()
+        # Паттерны скомпилированы с re.IGNORECASE, копия в нижнем регистре не нужна
+        command = _parse_command(text.strip())
+        if command is None:
+            return None
         
-        # Поиск команды по паттернам
-        for command, patterns in self.command_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text)
-                if match:
-                    return self._build_command(command, text, match.groups())
-        
-        return None
+        # Результат из кэша копируется, чтобы изменения вызывающего кода его не портили
+        return dict(command, parameters=dict(command["parameters"]))
     
-    def _build_command(self, command: str, text: str, groups: tuple) -> Dict[str, Any]:
+    def parse_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
         """
-        Построить структурированную команду
+        Парсить несколько текстов в команды
         
         Args:
-            command: Тип команды
-            text: Исходный текст
-            groups: Группы из регулярного выражения
+            texts: Тексты на естественном языке
             
         Returns:
-            Структурированная команда
+            Структурированные команды или None в порядке текстов
         """
-        parameters = {}
-        
-        if command == "create_box":
-            # Поиск размеров
-            dim_match = re.search(self.parameter_patterns["dimensions"], text)
-            if dim_match:
-                dims = [float(d) for d in dim_match.groups() if d]
-                if len(dims) >= 2:
-                    parameters["length"] = dims[0]
-                    parameters["width"] = dims[1]
-                    if len(dims) >= 3:
-                        parameters["height"] = dims[2]
-                    else:
-                        parameters["height"] = dims[1]  # По умолчанию
-        
-        elif command == "create_cylinder":
-            # Поиск радиуса и высоты
-            radius_match = re.search(self.parameter_patterns["radius"], text)
-            height_match = re.search(self.parameter_patterns["height"], text)
-            
-            if radius_match:
-                parameters["radius"] = float(radius_match.group(1))
-            if height_match:
-                parameters["height"] = float(height_match.group(1))
-        
-        elif command == "create_sphere":
-            # Поиск радиуса
-            radius_match = re.search(self.parameter_patterns["radius"], text)
-            if radius_match:
-                parameters["radius"] = float(radius_match.group(1))
-        
-        elif command == "extrude":
-            # Извлечение расстояния из групп
-            if groups and groups[0]:
-                parameters["distance"] = float(groups[0])
-        
-        elif command == "rotate":
-            # Извлечение угла и оси
-            if groups:
-                if groups[0]:
-                    parameters["angle"] = float(groups[0])
-                if len(groups) > 1 and groups[1]:
-                    parameters["axis"] = groups[1].upper()
-                else:
-                    parameters["axis"] = "Z"  # По умолчанию
-        
-        elif command == "translate":
-            # Извлечение расстояния и оси
-            if groups:
-                if groups[0]:
-                    distance = float(groups[0])
-                    axis = groups[1].upper() if len(groups) > 1 and groups[1] else "X"
-                    parameters[axis.lower()] = distance
-        
-        return {
-            "action": command,
-            "parameters": parameters,
-            "original_text": text
-        }
+        commands = []
+        for text in texts:
+            command = _parse_command(text.strip())
+            if command is not None:
+                command = dict(command, parameters=dict(command["parameters"]))
+            commands.append(command)
+        return commands
+    
+    @staticmethod
+    def cache_info():
+        """Статистика кэша разбора команд"""
+        return _parse_command.cache_info()
+    
+    @staticmethod
+    def cache_clear():
+        """Очистка кэша разбора команд"""
+        _parse_command.cache_clear()
     
     def validate_command(self, command: Dict[str, Any]) -> bool:
         """
@@ -164,23 +282,13 @@ class CommandParser:
         action = command["action"]
         parameters = command.get("parameters", {})
         
-        # Проверка обязательных параметров
-        required_params = {
-            "create_box": ["length", "width", "height"],
-            "create_cylinder": ["radius", "height"],
-            "create_sphere": ["radius"],
-            "extrude": ["distance"],
-            "rotate": ["angle"],
-            "translate": []  # Должна быть хотя бы одна ось
-        }
+        # Для translate нужна хотя бы одна ось, для остальных - все обязательные параметры
+        if action == "translate":
+            return not _TRANSLATE_AXES.isdisjoint(parameters)
         
-        if action in required_params:
-            required = required_params[action]
-            if action == "translate":
-                # Для translate нужна хотя бы одна ось
-                return any(axis in parameters for axis in ["x", "y", "z"])
-            else:
-                return all(param in parameters for param in required)
+        required = _REQUIRED_PARAMS.get(action)
+        if required is not None:
+            return parameters.keys() >= required
         
         return True
 
@@ -10,6 +10,47 @@ from .natural_language_processor import NaturalLanguageProcessor
 
 logger = logging.getLogger(__name__)
 
+# Описания доступных команд не меняются, поэтому собираются один раз;
+# get_available_commands отдает их копии
+_AVAILABLE_COMMANDS = (
+    {
+        "command": "create_box",
+        "description": "Создать прямоугольный параллелепипед",
+        "parameters": ("length", "width", "height"),
+        "example": "Создай коробку размером 10x5x3"
+    },
+    {
+        "command": "create_cylinder",
+        "description": "Создать цилиндр",
+        "parameters": ("radius", "height"),
+        "example": "Создай цилиндр радиусом 5 и высотой 10"
+    },
+    {
+        "command": "create_sphere",
+        "description": "Создать сферу",
+        "parameters": ("radius",),
+        "example": "Создай сферу радиусом 3"
+    },
+    {
+        "command": "extrude",
+        "description": "Выдавить объект",
+        "parameters": ("distance",),
+        "example": "Выдави на 5 единиц"
+    },
+    {
+        "command": "rotate",
+        "description": "Повернуть объект",
+        "parameters": ("angle", "axis"),
+        "example": "Поверни на 90 градусов вокруг оси Z"
+    },
+    {
+        "command": "translate",
+        "description": "Переместить объект",
+        "parameters": ("x", "y", "z"),
+        "example": "Перемести на 10 единиц по X"
+    }
+)
+
 
 class LLMInterface:
     """
@@ -40,11 +81,11 @@ class LLMInterface:
         try:
             # Анализ текста
             intent = self.nlp.analyze_intent(text)
-            logger.info(f"Определен интент: {intent}")
+            logger.info("Определен интент: %s", intent)
             
             # Парсинг команды
             command = self.command_parser.parse_natural_language(text, intent)
-            logger.info(f"Спарсена команда: {command}")
+            logger.info("Спарсена команда: %s", command)
             
             # Выполнение команды
             if command:
@@ -64,13 +105,66 @@ class LLMInterface:
                 }
                 
         except Exception as e:
-            logger.error(f"Ошибка обработки естественного языка: {e}")
+            logger.error("Ошибка обработки естественного языка: %s", e)
             return {
                 "success": False,
                 "error": str(e),
                 "message": "Ошибка обработки запроса"
             }
     
+    def process_natural_language_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Обработать несколько текстов на естественном языке
+        
+        Тексты разбираются без журналирования каждого шага, найденные команды
+        выполняются окружением одним вызовом. Для нескольких текстов
+        предпочтительнее вызова process_natural_language в цикле.
+        
+        Args:
+            texts: Тексты на естественном языке
+            
+        Returns:
+            Результаты обработки в порядке текстов, в формате process_natural_language
+        """
+        try:
+            intents = self.nlp.analyze_intents(texts)
+            commands = self.command_parser.parse_batch(texts)
+            
+            executed = self.env.execute_commands([
+                (command["action"], command.get("parameters", {}))
+                for command in commands
+                if command
+            ])
+        except Exception as e:
+            logger.error("Ошибка пакетной обработки естественного языка: %s", e)
+            error = {
+                "success": False,
+                "error": str(e),
+                "message": "Ошибка обработки запроса"
+            }
+            return [dict(error) for _ in texts]
+        
+        results = []
+        executed_iter = iter(executed)
+        for intent, command in zip(intents, commands):
+            if command:
+                results.append({
+                    "success": True,
+                    "intent": intent,
+                    "command": command,
+                    "result": next(executed_iter),
+                    "message": f"Выполнена команда: {command['action']}"
+                })
+            else:
+                results.append({
+                    "success": False,
+                    "intent": intent,
+                    "message": "Не удалось определить команду"
+                })
+        
+        logger.info("Обработано текстов: %d, выполнено команд: %d", len(texts), len(executed))
+        return results
+    
     def get_available_commands(self) -> List[Dict[str, Any]]:
         """
         Получить список доступных команд
@@ -79,42 +173,8 @@ class LLMInterface:
             Список команд с описаниями
         """
         return [
-            {
-                "command": "create_box",
-                "description": "Создать прямоугольный параллелепипед",
-                "parameters": ["length", "width", "height"],
-                "example": "Создай коробку размером 10x5x3"
-            },
-            {
-                "command": "create_cylinder",
-                "description": "Создать цилиндр",
-                "parameters": ["radius", "height"],
-                "example": "Создай цилиндр радиусом 5 и высотой 10"
-            },
-            {
-                "command": "create_sphere",
-                "description": "Создать сферу",
-                "parameters": ["radius"],
-                "example": "Создай сферу радиусом 3"
-            },
-            {
-                "command": "extrude",
-                "description": "Выдавить объект",
-                "parameters": ["distance"],
-                "example": "Выдави на 5 единиц"
-            },
-            {
-                "command": "rotate",
-                "description": "Повернуть объект",
-                "parameters": ["angle", "axis"],
-                "example": "Поверни на 90 градусов вокруг оси Z"
-            },
-            {
-                "command": "translate",
-                "description": "Переместить объект",
-                "parameters": ["x", "y", "z"],
-                "example": "Перемести на 10 единиц по X"
-            }
+            {**command, "parameters": list(command["parameters"])}
+            for command in _AVAILABLE_COMMANDS
         ]
     
     def get_context_info(self) -> Dict[str, Any]:
@@ -161,7 +221,7 @@ class LLMInterface:
             }
             
         except Exception as e:
-            logger.error(f"Ошибка выполнения структурированной команды: {e}")
+            logger.error("Ошибка выполнения структурированной команды: %s", e)
             return {
                 "success": False,
                 "error": str(e)
@@ -2,70 +2,203 @@
 Обработчик естественного языка для LLM интерфейса
 """
 
-import re
+import functools
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+# Модуль regex совместим с re и лучше работает с кириллицей в Unicode
+try:
+    import regex as re
+except ImportError:
+    import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# Паттерны намерений
+_RAW_INTENT_PATTERNS = {
+    "create_object": [
+        r"создай?\s+",
+        r"сделай?\s+",
+        r"добавь?\s+",
+        r"построй?\s+",
+        r"сгенерируй?\s+"
+    ],
+    "modify_object": [
+        r"измени?\s+",
+        r"модифицируй?\s+",
+        r"отредактируй?\s+",
+        r"настрой?\s+"
+    ],
+    "transform_object": [
+        r"поверни?\s+",
+        r"перемести?\s+",
+        r"сдвинь?\s+",
+        r"выдави?\s+",
+        r"вытяни?\s+",
+        r"масштабируй?\s+"
+    ],
+    "delete_object": [
+        r"удали?\s+",
+        r"убери?\s+",
+        r"уничтожь?\s+"
+    ],
+    "query_object": [
+        r"покажи?\s+",
+        r"отобрази?\s+",
+        r"выведи?\s+",
+        r"расскажи?\s+",
+        r"какой?\s+",
+        r"что?\s+",
+        r"где?\s+"
+    ],
+    "file_operation": [
+        r"сохрани?\s+",
+        r"загрузи?\s+",
+        r"открой?\s+",
+        r"экспортируй?\s+",
+        r"импортируй?\s+"
+    ]
+}
+
+# Паттерны компилируются один раз при импорте модуля
+_INTENT_PATTERNS = {
+    intent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for intent, patterns in _RAW_INTENT_PATTERNS.items()
+}
+# Паттерны каждого намерения, объединенные в одну альтернацию: один поиск на
+# намерение вместо цикла по паттернам, порядок намерений задает приоритет
+_INTENT_SEARCH = tuple(
+    (intent, re.compile("|".join(patterns), re.IGNORECASE))
+    for intent, patterns in _RAW_INTENT_PATTERNS.items()
+)
+# Любое из намерений: один поиск вместо перебора всех паттернов
+_RE_ANY_INTENT = re.compile(
+    "|".join(pattern for patterns in _RAW_INTENT_PATTERNS.values() for pattern in patterns),
+    re.IGNORECASE
+)
+# Число с необязательными префиксом координаты ("x=", "y:") и единицей измерения;
+# префикс следующей координаты единицей не считается
+_RE_ENTITY = re.compile(
+    r"(?:(?P<axis>[xyz])\s*[=:]\s*)?(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>(?![xyz]\s*[=:])[а-яa-z]+)?",
+    re.IGNORECASE
+)
+# Единица, при которой число считается углом ("градусо" или "градусов")
+_ANGLE_UNIT_PREFIX = "градусо"
+_RE_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# Слова, указывающие на размеры
+_DIMENSION_WORDS = ("размером", "радиусом", "высотой")
+
+
+@functools.lru_cache(maxsize=16)
+def _build_automaton(words: Tuple[str, ...]):
+    """
+    Построение автомата Ахо-Корасик для поиска слов за один проход по тексту
+    
+    Автомат только читается, поэтому для одинакового набора слов
+    он строится один раз и общий для всех процессоров.
+    
+    Args:
+        words: Искомые слова
+        
+    Returns:
+        Автомат или None, если pyahocorasick не установлен
+    """
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+def _find_words(automaton, words: Iterable[str], text: str) -> Set[str]:
+    """
+    Найти слова, входящие в текст как подстроки
+    
+    Args:
+        automaton: Автомат из _build_automaton или None
+        words: Искомые слова (используются без автомата)
+        text: Текст для поиска
+        
+    Returns:
+        Множество найденных слов
+    """
+    if automaton is None:
+        return {word for word in words if word in text}
+    return {word for _, word in automaton.iter(text)}
+
+
+_DIMENSION_AUTOMATON = _build_automaton(_DIMENSION_WORDS)
+
+# Предложения для автодополнения по префиксам команд
+_SUGGESTIONS = (
+    (("создай", "сделай"), (
+        "создай коробку размером 10x5x3",
+        "создай цилиндр радиусом 5 и высотой 10",
+        "создай сферу радиусом 3"
+    )),
+    (("поверни", "поворот"), (
+        "поверни на 90 градусов вокруг оси Z",
+        "поверни на 45 градусов вокруг оси X"
+    )),
+    (("перемести", "сдвинь"), (
+        "перемести на 10 единиц по оси X",
+        "перемести на 5 единиц по оси Y"
+    )),
+    (("выдави", "вытяни"), (
+        "выдави на 5 единиц",
+        "вытяни на 10 единиц"
+    )),
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _analyze_intent(text: str) -> str:
+    """
+    Поиск намерения в тексте; результат зависит только от текста и кэшируется
+    
+    Args:
+        text: Текст без пробелов по краям
+        
+    Returns:
+        Намерение или "unknown"
+    """
+    if not _RE_ANY_INTENT.search(text):
+        return "unknown"
+    
+    for intent, pattern in _INTENT_SEARCH:
+        if pattern.search(text):
+            return intent
+    
+    return "unknown"
+
 
 class NaturalLanguageProcessor:
     """
     Обработчик естественного языка для определения намерений
     """
     
+    __slots__ = ("intent_patterns", "object_types", "_object_automaton", "measurement_units")
+    
     def __init__(self):
         """Инициализация NLP процессора"""
-        self.intent_patterns = {
-            "create_object": [
-                r"создай?\s+",
-                r"сделай?\s+",
-                r"добавь?\s+",
-                r"построй?\s+",
-                r"сгенерируй?\s+"
-            ],
-            "modify_object": [
-                r"измени?\s+",
-                r"модифицируй?\s+",
-                r"отредактируй?\s+",
-                r"настрой?\s+"
-            ],
-            "transform_object": [
-                r"поверни?\s+",
-                r"перемести?\s+",
-                r"сдвинь?\s+",
-                r"выдави?\s+",
-                r"вытяни?\s+",
-                r"масштабируй?\s+"
-            ],
-            "delete_object": [
-                r"удали?\s+",
-                r"убери?\s+",
-                r"уничтожь?\s+"
-            ],
-            "query_object": [
-                r"покажи?\s+",
-                r"отобрази?\s+",
-                r"выведи?\s+",
-                r"расскажи?\s+",
-                r"какой?\s+",
-                r"что?\s+",
-                r"где?\s+"
-            ],
-            "file_operation": [
-                r"сохрани?\s+",
-                r"загрузи?\s+",
-                r"открой?\s+",
-                r"экспортируй?\s+",
-                r"импортируй?\s+"
-            ]
-        }
+        self.intent_patterns = _INTENT_PATTERNS
         
         self.object_types = [
             "коробка", "прямоугольник", "куб", "параллелепипед",
             "цилиндр", "сфера", "шар", "конус", "пирамида",
             "тор", "кольцо", "труба", "объект", "элемент"
         ]
+        # Автомат строится по списку типов на момент инициализации
+        self._object_automaton = _build_automaton(tuple(self.object_types))
         
         self.measurement_units = {
             "мм": 1.0,
@@ -87,17 +220,35 @@ class NaturalLanguageProcessor:
         Returns:
             Определенное намерение
         """
-        text = text.lower().strip()
+        # Паттерны скомпилированы с re.IGNORECASE, копия в нижнем регистре не нужна
+        text = text.strip()
         
-        # Поиск намерения по паттернам
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text):
-                    logger.info(f"Найдено намерение '{intent}' для текста: {text}")
-                    return intent
+        intent = _analyze_intent(text)
+        if intent != "unknown":
+            logger.info("Найдено намерение '%s' для текста: %s", intent, text)
+        return intent
+    
+    def analyze_intents(self, texts: List[str]) -> List[str]:
+        """
+        Определить намерения для нескольких текстов без журналирования каждого
         
-        # Если намерение не определено, возвращаем общее
-        return "unknown"
+        Args:
+            texts: Тексты для анализа
+            
+        Returns:
+            Намерения в порядке текстов
+        """
+        return [_analyze_intent(text.strip()) for text in texts]
+    
+    @staticmethod
+    def cache_info():
+        """Статистика кэша определения намерений"""
+        return _analyze_intent.cache_info()
+    
+    @staticmethod
+    def cache_clear():
+        """Очистка кэша определения намерений"""
+        _analyze_intent.cache_clear()
     
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """
@@ -118,37 +269,38 @@ class NaturalLanguageProcessor:
             "materials": []
         }
         
+        # Словарь типов объектов и единиц измерения - в нижнем регистре
         text = text.lower()
         
-        # Поиск типов объектов
-        for obj_type in self.object_types:
-            if obj_type in text:
-                entities["object_types"].append(obj_type)
-        
-        # Поиск измерений
-        measurement_pattern = r"(\d+(?:\.\d+)?)\s*([а-яa-z]+)?"
-        matches = re.findall(measurement_pattern, text)
-        for value, unit in matches:
-            value = float(value)
-            if unit and unit in self.measurement_units:
-                # Конвертация в мм
-                value *= self.measurement_units[unit]
-            entities["measurements"].append(value)
-        
-        # Поиск координат
-        coord_pattern = r"([xyz])\s*[=:]\s*(\d+(?:\.\d+)?)"
-        coord_matches = re.findall(coord_pattern, text)
-        for axis, value in coord_matches:
-            entities["coordinates"].append({
-                "axis": axis.upper(),
-                "value": float(value)
-            })
-        
-        # Поиск углов
-        angle_pattern = r"(\d+(?:\.\d+)?)\s*градусов?"
-        angle_matches = re.findall(angle_pattern, text)
-        for angle in angle_matches:
-            entities["angles"].append(float(angle))
+        # Поиск типов объектов за один проход; порядок - как в self.object_types
+        found = _find_words(self._object_automaton, self.object_types, text)
+        entities["object_types"] = [obj_type for obj_type in self.object_types if obj_type in found]
+        
+        # Измерения, координаты и углы находятся за один проход: каждое число -
+        # измерение, с префиксом "x=" - еще и координата, с единицей "градусов" - угол
+        measurements = entities["measurements"]
+        units = self.measurement_units
+        for match in _RE_ENTITY.finditer(text):
+            raw_value = float(match.group("value"))
+            unit = match.group("unit")
+            
+            value = raw_value
+            if unit:
+                # Конвертация в мм: один поиск в словаре вместо проверки и чтения
+                factor = units.get(unit)
+                if factor is not None:
+                    value *= factor
+            measurements.append(value)
+            
+            axis = match.group("axis")
+            if axis:
+                entities["coordinates"].append({
+                    "axis": axis.upper(),
+                    "value": raw_value
+                })
+            
+            if unit and unit.startswith(_ANGLE_UNIT_PREFIX):
+                entities["angles"].append(raw_value)
         
         return entities
     
@@ -162,34 +314,18 @@ class NaturalLanguageProcessor:
         Returns:
             Список предложений
         """
-        suggestions = []
         text = text.lower().strip()
         
-        # Предложения по командам
-        if not text or text.startswith("создай") or text.startswith("сделай"):
-            suggestions.extend([
-                "создай коробку размером 10x5x3",
-                "создай цилиндр радиусом 5 и высотой 10",
-                "создай сферу радиусом 3"
-            ])
-        
-        elif text.startswith("поверни") or text.startswith("поворот"):
-            suggestions.extend([
-                "поверни на 90 градусов вокруг оси Z",
-                "поверни на 45 градусов вокруг оси X"
-            ])
-        
-        elif text.startswith("перемести") or text.startswith("сдвинь"):
-            suggestions.extend([
-                "перемести на 10 единиц по оси X",
-                "перемести на 5 единиц по оси Y"
-            ])
-        
-        elif text.startswith("выдави") or text.startswith("вытяни"):
-            suggestions.extend([
-                "выдави на 5 единиц",
-                "вытяни на 10 единиц"
-            ])
+        # Пустой текст - предложения по созданию объектов
+        if not text:
+            return list(_SUGGESTIONS[0][1][:5])
+        
+        # Предложения по командам: startswith с кортежем проверяет все префиксы одним вызовом
+        suggestions = []
+        for prefixes, items in _SUGGESTIONS:
+            if text.startswith(prefixes):
+                suggestions.extend(items)
+                break
         
         return suggestions[:5]  # Ограничиваем количество предложений
     
@@ -215,18 +351,14 @@ class NaturalLanguageProcessor:
             return result
         
         # Проверка на наличие командных слов
-        has_command = any(
-            re.search(pattern, text.lower())
-            for patterns in self.intent_patterns.values()
-            for pattern in patterns
-        )
+        has_command = bool(_RE_ANY_INTENT.search(text))
         
         if not has_command:
             result["warnings"].append("Не найдено командных слов")
         
         # Проверка на наличие числовых значений для команд с параметрами
-        has_numbers = bool(re.search(r"\d+(?:\.\d+)?", text))
-        if not has_numbers and any(word in text.lower() for word in ["размером", "радиусом", "высотой"]):
+        has_numbers = bool(_RE_NUMBER.search(text))
+        if not has_numbers and _find_words(_DIMENSION_AUTOMATON, _DIMENSION_WORDS, text.lower()):
             result["warnings"].append("Указаны размеры, но не найдены числовые значения")
         
         return result
@@ -2,8 +2,10 @@
 Тренер для LLM работы с FreeCAD
 """
 
+import functools
 import logging
 import json
+import os
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import torch
@@ -14,34 +16,195 @@ from transformers import (
     Trainer,
     DataCollatorForLanguageModeling
 )
+from torch.utils.data import DataLoader
 from datasets import Dataset
 
+try:
+    from transformers import BitsAndBytesConfig
+except ImportError:
+    BitsAndBytesConfig = None
+
+try:
+    import peft
+except ImportError:
+    peft = None
+
+from .model_evaluator import _word_similarity
+
 logger = logging.getLogger(__name__)
 
+# Число текстов в одном вызове токенизатора при подготовке данных
+_TOKENIZE_BATCH_SIZE = 1000
+
+# Режимы квантования весов модели при загрузке
+QUANTIZATION_MODES = ("none", "int8", "int4")
+
+
+def _mixed_precision_args() -> Dict[str, Any]:
+    """
+    Аргументы смешанной точности для TrainingArguments по возможностям GPU
+    
+    Returns:
+        Флаги bf16/fp16/tf32 и оптимизатор
+    """
+    if not torch.cuda.is_available():
+        return {}
+    
+    bf16 = torch.cuda.is_bf16_supported()
+    return {
+        "bf16": bf16,
+        "fp16": not bf16,
+        # TF32 доступен начиная с архитектуры Ampere
+        "tf32": torch.cuda.get_device_capability()[0] >= 8,
+        "optim": "adamw_torch_fused",
+    }
+
+
+def _autocast_dtype() -> Optional[torch.dtype]:
+    """
+    Тип данных для autocast при генерации
+    
+    Returns:
+        bfloat16 или float16 на GPU, None без CUDA (autocast отключается)
+    """
+    if not torch.cuda.is_available():
+        return None
+    return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+
+
+def _quantization_config(quantization: str):
+    """
+    Конфигурация bitsandbytes для режима квантования
+    
+    Args:
+        quantization: Режим из QUANTIZATION_MODES
+        
+    Returns:
+        BitsAndBytesConfig или None для режима "none"
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Неизвестный режим квантования: {quantization}")
+    if quantization == "none":
+        return None
+    if BitsAndBytesConfig is None or peft is None:
+        raise ImportError("Для квантования требуются пакеты bitsandbytes и peft")
+    
+    if quantization == "int8":
+        return BitsAndBytesConfig(load_in_8bit=True)
+    return BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=_autocast_dtype() or torch.float32,
+    )
+
+
+def _attach_lora(model):
+    """
+    Подготовка квантованной модели к обучению через адаптеры LoRA
+    
+    Квантованные веса заморожены, обучаются адаптеры и слой эмбеддингов,
+    в который добавлены специальные токены FreeCAD.
+    
+    Args:
+        model: Квантованная модель
+        
+    Returns:
+        Модель peft с адаптерами LoRA
+    """
+    embeddings = model.get_input_embeddings()
+    embeddings_name = next(name for name, module in model.named_modules() if module is embeddings)
+    
+    model = peft.prepare_model_for_kbit_training(model)
+    config = peft.LoraConfig(
+        task_type="CAUSAL_LM",
+        r=8,
+        lora_alpha=16,
+        lora_dropout=0.05,
+        modules_to_save=[embeddings_name.rsplit(".", 1)[-1]],
+    )
+    return peft.get_peft_model(model, config)
+
+
+def _tokenize_prompts(tokenizer, descriptions: List[str]):
+    """
+    Токенизация описаний в запросы генерации
+    
+    Функция модульного уровня: используется как collate_fn в процессах DataLoader.
+    
+    Args:
+        tokenizer: Токенизатор модели
+        descriptions: Описания на естественном языке
+        
+    Returns:
+        Тензоры input_ids и attention_mask
+    """
+    input_texts = [f"<bos>Описание: {description}<sep>Код:" for description in descriptions]
+    
+    # Для декодера дополнение слева, чтобы генерация продолжала
+    # последний настоящий токен каждого описания
+    padding_side = tokenizer.padding_side
+    tokenizer.padding_side = "left"
+    try:
+        return tokenizer(input_texts, padding=True, return_tensors="pt")
+    finally:
+        tokenizer.padding_side = padding_side
+
 
 class LLMTrainer:
     """
     Тренер для обучения LLM работе с FreeCAD
     """
     
-    def __init__(self, model_name: str = "microsoft/DialoGPT-medium"):
+    def __init__(self, model_name: str = "microsoft/DialoGPT-medium", compile_model: bool = True):
         """
         Инициализация тренера
         
         Args:
             model_name: Название базовой модели
+            compile_model: Компилировать модель через torch.compile при обучении на GPU
         """
         self.model_name = model_name
+        self.compile_model = compile_model
+        self.quantization = "none"
         self.tokenizer = None
         self.model = None
         self.trainer = None
         self.training_data = []
+    
+    @property
+    def device(self) -> Optional[torch.device]:
+        """
+        Устройство, на котором модель находится сейчас
         
-    def setup_model(self):
-        """Настройка модели и токенизатора"""
+        Определяется при каждом обращении: Trainer переносит модель на GPU уже после setup_model.
+        
+        Returns:
+            Устройство модели или None, если модель не загружена
+        """
+        if self.model is None:
+            return None
+        return next(self.model.parameters()).device
+    
+    def setup_model(self, quantization: str = "none"):
+        """
+        Настройка модели и токенизатора
+        
+        Квантованная модель (int8 или int4 через bitsandbytes) занимает в 2-4 раза
+        меньше памяти и дообучается адаптерами LoRA, так как квантованные веса
+        не обучаются напрямую.
+        
+        Args:
+            quantization: Режим квантования весов: "none", "int8" или "int4"
+        """
         try:
+            quantization_config = _quantization_config(quantization)
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
+            if quantization_config is None:
+                self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
+            else:
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name, quantization_config=quantization_config, device_map="auto"
+                )
             
             # Добавляем специальные токены для FreeCAD
             special_tokens = {
@@ -53,6 +216,9 @@ class LLMTrainer:
             
             self.tokenizer.add_special_tokens(special_tokens)
             self.model.resize_token_embeddings(len(self.tokenizer))
+            if quantization_config is not None:
+                self.model = _attach_lora(self.model)
+            self.quantization = quantization
             
             logger.info(f"Модель {self.model_name} загружена успешно")
             
@@ -60,12 +226,16 @@ class LLMTrainer:
             logger.error(f"Ошибка загрузки модели: {e}")
             raise
     
-    def prepare_training_data(self, dataset: List[Dict[str, Any]]) -> Dataset:
+    def prepare_training_data(self, dataset: List[Dict[str, Any]], num_proc: Optional[int] = None) -> Dataset:
         """
         Подготовка данных для обучения
         
+        Тексты токенизируются без дополнения: DataCollatorForLanguageModeling
+        дополняет каждый батч до его самой длинной последовательности.
+        
         Args:
             dataset: Датасет для обучения
+            num_proc: Число процессов токенизации (по умолчанию половина ядер)
             
         Returns:
             Подготовленный датасет
@@ -73,28 +243,28 @@ class LLMTrainer:
         if not self.tokenizer:
             raise ValueError("Токенизатор не инициализирован. Вызовите setup_model() сначала.")
         
-        training_texts = []
+        # Создаем текст для обучения в формате: описание -> код
+        training_texts = [
+            f"<bos>Описание: {sample['description']}<sep>Код: {sample['generated_code']}<eos>"
+            for sample in dataset
+        ]
         
-        for sample in dataset:
-            # Создаем текст для обучения в формате: описание -> код
-            text = f"<bos>Описание: {sample['description']}<sep>Код: {sample['generated_code']}<eos>"
-            training_texts.append(text)
+        if num_proc is None:
+            num_proc = max(1, (os.cpu_count() or 1) // 2)
+        # Процессу достается хотя бы один батч: для малых датасетов
+        # запуск процессов дороже пакетной токенизации в одном процессе
+        num_proc = max(1, min(num_proc, -(-len(training_texts) // _TOKENIZE_BATCH_SIZE)))
         
-        # Токенизация
-        tokenized = self.tokenizer(
-            training_texts,
-            truncation=True,
-            padding=True,
-            max_length=512,
-            return_tensors="pt"
+        # Токенизация батчами: быстрый токенизатор обрабатывает батч одним вызовом
+        tokenizer = self.tokenizer
+        dataset = Dataset.from_dict({"text": training_texts}).map(
+            lambda batch: tokenizer(batch["text"], truncation=True, max_length=512),
+            batched=True,
+            batch_size=_TOKENIZE_BATCH_SIZE,
+            num_proc=num_proc if num_proc > 1 else None,
+            remove_columns=["text"]
         )
         
-        # Создание датасета
-        dataset = Dataset.from_dict({
-            "input_ids": tokenized["input_ids"],
-            "attention_mask": tokenized["attention_mask"]
-        })
-        
         logger.info(f"Подготовлено {len(dataset)} образцов для обучения")
         return dataset
     
@@ -104,10 +274,18 @@ class LLMTrainer:
               output_dir: str = "./freecad_model",
               num_epochs: int = 3,
               batch_size: int = 4,
-              learning_rate: float = 5e-5) -> Dict[str, Any]:
+              learning_rate: float = 5e-5,
+              gradient_checkpointing: bool = False,
+              grad_accum: int = 1,
+              num_workers: int = 4,
+              optim: Optional[str] = None) -> Dict[str, Any]:
         """
         Обучение модели
         
+        Для обучения на нескольких GPU скрипт запускается через
+        `torchrun --nproc_per_node=N train_script.py`: Trainer читает
+        WORLD_SIZE/LOCAL_RANK из окружения и сам включает DDP.
+        
         Args:
             training_data: Данные для обучения
             validation_data: Данные для валидации
@@ -115,6 +293,12 @@ class LLMTrainer:
             num_epochs: Количество эпох
             batch_size: Размер батча
             learning_rate: Скорость обучения
+            gradient_checkpointing: Пересчитывать активации при обратном проходе
+                (меньше памяти под больший batch_size ценой лишних вычислений)
+            grad_accum: Число шагов накопления градиентов на один шаг оптимизатора
+            num_workers: Число процессов загрузки данных
+            optim: Оптимизатор Trainer ("adamw_torch_fused", "adafactor" - без
+                вторых моментов); по умолчанию слитный AdamW на GPU
             
         Returns:
             Результаты обучения
@@ -122,12 +306,26 @@ class LLMTrainer:
         if not self.model or not self.tokenizer:
             raise ValueError("Модель не инициализирована. Вызовите setup_model() сначала.")
         
+        if torch.cuda.is_available():
+            # Матричные умножения в float32 на GPU с Tensor Cores выполняются через TF32
+            torch.set_float32_matmul_precision("high")
+        
+        precision_args = _mixed_precision_args()
+        if optim is not None:
+            precision_args["optim"] = optim
+        
+        if gradient_checkpointing:
+            # KV-кэш несовместим с пересчетом активаций при обучении
+            self.model.gradient_checkpointing_enable()
+            self.model.config.use_cache = False
+        
         # Настройка аргументов обучения
         training_args = TrainingArguments(
             output_dir=output_dir,
             num_train_epochs=num_epochs,
             per_device_train_batch_size=batch_size,
             per_device_eval_batch_size=batch_size,
+            gradient_accumulation_steps=grad_accum,
             warmup_steps=100,
             weight_decay=0.01,
             logging_dir=f"{output_dir}/logs",
@@ -137,12 +335,27 @@ class LLMTrainer:
             eval_steps=500 if validation_data else None,
             save_total_limit=2,
             load_best_model_at_end=True if validation_data else False,
+            gradient_checkpointing=gradient_checkpointing,
+            # Все параметры модели участвуют в обратном проходе, поиск неиспользуемых в DDP не нужен
+            ddp_find_unused_parameters=False,
+            dataloader_num_workers=num_workers,
+            dataloader_pin_memory=True,
+            dataloader_persistent_workers=num_workers > 0,
+            # Каждый процесс загрузки готовит батчи заранее, пока идет шаг обучения
+            dataloader_prefetch_factor=2 if num_workers > 0 else None,
+            # Trainer сам оборачивает модель в torch.compile; сохраняется исходная модель
+            # Слои bitsandbytes не компилируются torch.compile
+            torch_compile=(self.compile_model and self.quantization == "none"
+                           and torch.cuda.is_available() and hasattr(torch, "compile")),
+            # На GPU - смешанная точность bf16/fp16, TF32 и слитный AdamW
+            **precision_args,
         )
         
-        # Коллатор данных
+        # Коллатор данных; длина батча кратна 8 для ядер Tensor Cores в смешанной точности
         data_collator = DataCollatorForLanguageModeling(
             tokenizer=self.tokenizer,
-            mlm=False
+            mlm=False,
+            pad_to_multiple_of=8
         )
         
         # Создание тренера
@@ -183,30 +396,69 @@ class LLMTrainer:
         Returns:
             Сгенерированный код
         """
+        return self.generate_batch([description], max_length=max_length)[0]
+    
+    def generate_batch(self, descriptions: List[str], max_length: int = 256) -> List[str]:
+        """
+        Генерация кода по нескольким описаниям за один вызов модели
+        
+        Args:
+            descriptions: Описания на естественном языке
+            max_length: Максимальная длина генерируемого текста
+            
+        Returns:
+            Сгенерированный код в порядке описаний
+        """
         if not self.model or not self.tokenizer:
             raise ValueError("Модель не инициализирована")
         
-        # Подготовка входного текста
-        input_text = f"<bos>Описание: {description}<sep>Код:"
+        if not descriptions:
+            return []
+        
+        inputs = _tokenize_prompts(self.tokenizer, descriptions)
+        return self._generate_from_inputs(inputs, max_length)
+    
+    def _generate_from_inputs(self, inputs, max_length: int) -> List[str]:
+        """
+        Генерация кода по токенизированным запросам
         
-        # Токенизация
-        inputs = self.tokenizer.encode(input_text, return_tensors="pt")
+        Args:
+            inputs: Результат _tokenize_prompts
+            max_length: Максимальная длина генерируемого текста
+            
+        Returns:
+            Сгенерированный код в порядке запросов
+        """
+        # Из закрепленной памяти копирование на GPU идет асинхронно
+        device = self.device
+        input_ids = inputs["input_ids"].to(device, non_blocking=True)
+        attention_mask = inputs["attention_mask"].to(device, non_blocking=True)
         
-        # Генерация
-        with torch.no_grad():
+        # Генерация; attention_mask передается явно, чтобы дополнение не попадало в KV-кэш
+        autocast_dtype = _autocast_dtype()
+        with torch.inference_mode(), torch.autocast(
+            device_type="cuda",
+            dtype=autocast_dtype,
+            enabled=autocast_dtype is not None
+        ):
             outputs = self.model.generate(
-                inputs,
+                input_ids=input_ids,
+                attention_mask=attention_mask,
                 max_length=max_length,
                 num_return_sequences=1,
                 temperature=0.7,
                 do_sample=True,
+                use_cache=True,
                 pad_token_id=self.tokenizer.eos_token_id
             )
         
         # Декодирование
-        generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        # Извлечение только кода
+        generated_texts = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        return [self._extract_code(text) for text in generated_texts]
+    
+    @staticmethod
+    def _extract_code(generated_text: str) -> str:
+        """Извлечение только кода из сгенерированного текста"""
         if "<sep>Код:" in generated_text:
             code = generated_text.split("<sep>Код:")[1].strip()
             # Убираем лишние токены
@@ -215,12 +467,20 @@ class LLMTrainer:
         else:
             return generated_text
     
-    def evaluate_model(self, test_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def evaluate_model(self,
+                       test_data: List[Dict[str, Any]],
+                       batch_size: int = 32,
+                       num_workers: int = 2) -> Dict[str, Any]:
         """
         Оценка качества модели
         
+        Описания токенизируются в процессах DataLoader, пока модель генерирует
+        код для предыдущего батча; на GPU батчи передаются из закрепленной памяти.
+        
         Args:
             test_data: Тестовые данные
+            batch_size: Число описаний, генерируемых за один вызов модели
+            num_workers: Число процессов токенизации (0 - в основном процессе)
             
         Returns:
             Метрики качества
@@ -231,26 +491,37 @@ class LLMTrainer:
         correct_predictions = 0
         total_predictions = len(test_data)
         results = []
+        device = self.device
         
-        for sample in test_data:
-            description = sample["description"]
-            expected_code = sample["generated_code"]
-            
-            # Генерация кода
-            generated_code = self.generate_code(description)
-            
-            # Простая оценка (можно улучшить)
-            similarity = self._calculate_similarity(generated_code, expected_code)
+        loader = DataLoader(
+            [sample["description"] for sample in test_data],
+            batch_size=batch_size,
+            num_workers=num_workers,
+            pin_memory=device is not None and device.type == "cuda",
+            collate_fn=functools.partial(_tokenize_prompts, self.tokenizer)
+        )
+        
+        for start, inputs in zip(range(0, total_predictions, batch_size), loader):
+            batch = test_data[start:start + batch_size]
             
-            results.append({
-                "description": description,
-                "expected": expected_code,
-                "generated": generated_code,
-                "similarity": similarity
-            })
+            # Генерация кода для батча описаний
+            generated_codes = self._generate_from_inputs(inputs, max_length=256)
             
-            if similarity > 0.7:  # Порог схожести
-                correct_predictions += 1
+            for sample, generated_code in zip(batch, generated_codes):
+                expected_code = sample["generated_code"]
+                
+                # Простая оценка (можно улучшить)
+                similarity = self._calculate_similarity(generated_code, expected_code)
+                
+                results.append({
+                    "description": sample["description"],
+                    "expected": expected_code,
+                    "generated": generated_code,
+                    "similarity": similarity
+                })
+                
+                if similarity > 0.7:  # Порог схожести
+                    correct_predictions += 1
         
         accuracy = correct_predictions / total_predictions if total_predictions > 0 else 0
         
@@ -263,19 +534,8 @@ class LLMTrainer:
     
     def _calculate_similarity(self, code1: str, code2: str) -> float:
         """Расчет схожести между двумя кодами"""
-        # Простая метрика схожести (можно улучшить)
-        words1 = set(code1.lower().split())
-        words2 = set(code2.lower().split())
-        
-        if not words1 and not words2:
-            return 1.0
-        if not words1 or not words2:
-            return 0.0
-        
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-        
-        return intersection / union if union > 0 else 0.0
+        # Простая метрика схожести (можно улучшить); та же, что в ModelEvaluator
+        return _word_similarity(code1, code2)
     
     def save_model(self, path: str):
         """Сохранение модели"""
@@ -290,7 +550,13 @@ class LLMTrainer:
         """Загрузка модели"""
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(path)
-            self.model = AutoModelForCausalLM.from_pretrained(path)
+            if (Path(path) / "adapter_config.json").exists():
+                # Адаптеры LoRA квантованной модели поверх базовой модели
+                if peft is None:
+                    raise ImportError("Для загрузки адаптеров LoRA требуется пакет peft")
+                self.model = peft.AutoPeftModelForCausalLM.from_pretrained(path)
+            else:
+                self.model = AutoModelForCausalLM.from_pretrained(path)
             logger.info(f"Модель загружена из {path}")
         except Exception as e:
             logger.error(f"Ошибка загрузки модели: {e}")
@@ -2,12 +2,43 @@
 Оценщик качества модели
 """
 
+import ast
 import logging
+import re
+from collections import Counter
 from typing import Dict, Any, List, Optional
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Паттерны компилируются один раз при импорте модуля
+_RE_FREECAD_CALL = re.compile(r"FreeCAD\.(\w+)")
+_RE_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _word_similarity(code1: str, code2: str) -> float:
+    """
+    Коэффициент Жаккара по словам двух фрагментов кода без учета регистра
+    
+    Args:
+        code1: Первый фрагмент
+        code2: Второй фрагмент
+        
+    Returns:
+        Схожесть от 0 до 1
+    """
+    words1 = frozenset(code1.lower().split())
+    words2 = frozenset(code2.lower().split())
+    
+    if not words1 and not words2:
+        return 1.0
+    if not words1 or not words2:
+        return 0.0
+    
+    # |A ∪ B| = |A| + |B| - |A ∩ B|, объединение не строится
+    intersection = len(words1 & words2)
+    return intersection / (len(words1) + len(words2) - intersection)
+
 
 class ModelEvaluator:
     """
@@ -50,7 +81,8 @@ class ModelEvaluator:
     def _check_syntax(self, code: str) -> float:
         """Проверка синтаксиса кода"""
         try:
-            compile(code, '<string>', 'exec')
+            # Достаточно дерева разбора, байткод не нужен
+            ast.parse(code)
             return 1.0
         except SyntaxError:
             return 0.0
@@ -60,46 +92,28 @@ class ModelEvaluator:
     def _calculate_semantic_similarity(self, code1: str, code2: str) -> float:
         """Расчет семантической схожести"""
         # Простая метрика схожести
-        words1 = set(code1.lower().split())
-        words2 = set(code2.lower().split())
-        
-        if not words1 and not words2:
-            return 1.0
-        if not words1 or not words2:
-            return 0.0
-        
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-        
-        return intersection / union if union > 0 else 0.0
+        return _word_similarity(code1, code2)
     
     def _check_freecad_calls(self, generated: str, expected: str) -> float:
         """Проверка соответствия вызовов FreeCAD"""
-        import re
-        
         # Извлечение вызовов FreeCAD
-        generated_calls = set(re.findall(r'FreeCAD\.(\w+)', generated))
-        expected_calls = set(re.findall(r'FreeCAD\.(\w+)', expected))
+        generated_calls = frozenset(_RE_FREECAD_CALL.findall(generated))
+        expected_calls = frozenset(_RE_FREECAD_CALL.findall(expected))
         
         if not expected_calls:
             return 1.0 if not generated_calls else 0.5
         
-        intersection = len(generated_calls.intersection(expected_calls))
-        return intersection / len(expected_calls)
+        return len(generated_calls & expected_calls) / len(expected_calls)
     
     def _check_parameters(self, generated: str, expected: str) -> float:
         """Проверка точности параметров"""
-        import re
-        
         # Извлечение числовых параметров
-        generated_params = set(re.findall(r'(\d+(?:\.\d+)?)', generated))
-        expected_params = set(re.findall(r'(\d+(?:\.\d+)?)', expected))
-        
+        expected_params = frozenset(_RE_NUMBER.findall(expected))
         if not expected_params:
             return 1.0
         
-        intersection = len(generated_params.intersection(expected_params))
-        return intersection / len(expected_params)
+        generated_params = frozenset(_RE_NUMBER.findall(generated))
+        return len(generated_params & expected_params) / len(expected_params)
     
     def evaluate_model_performance(self, test_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -115,32 +129,33 @@ class ModelEvaluator:
             return {"error": "Нет данных для оценки"}
         
         total_samples = len(test_results)
-        successful_generations = sum(1 for r in test_results if r.get("success", False))
+        successful_generations = 0
+        quality_scores = []
+        error_types = Counter()
+        
+        # Успехи, баллы качества и ошибки собираются за один проход
+        for result in test_results:
+            if result.get("success", False):
+                successful_generations += 1
+            else:
+                error_types[result.get("error_type", "unknown")] += 1
+            
+            quality_metrics = result.get("quality_metrics")
+            if quality_metrics is not None:
+                quality_scores.append(quality_metrics.get("overall_score", 0))
         
         # Расчет метрик
         accuracy = successful_generations / total_samples if total_samples > 0 else 0
         
-        # Средние баллы качества
-        quality_scores = []
-        for result in test_results:
-            if "quality_metrics" in result:
-                quality_scores.append(result["quality_metrics"].get("overall_score", 0))
-        
+        # Средний балл качества
         avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
         
-        # Анализ ошибок
-        error_types = {}
-        for result in test_results:
-            if not result.get("success", False):
-                error_type = result.get("error_type", "unknown")
-                error_types[error_type] = error_types.get(error_type, 0) + 1
-        
         return {
             "total_samples": total_samples,
             "successful_generations": successful_generations,
             "accuracy": accuracy,
             "average_quality_score": avg_quality,
-            "error_distribution": error_types,
+            "error_distribution": dict(error_types),
             "performance_grade": self._calculate_performance_grade(accuracy, avg_quality)
         }
     
@@ -210,12 +225,12 @@ class ModelEvaluator:
     
     def save_evaluation_results(self, results: Dict[str, Any], filepath: str):
         """Сохранение результатов оценки"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
-        logger.info(f"Результаты оценки сохранены: {filepath}")
+        logger.info("Результаты оценки сохранены: %s", filepath)
     
     def load_evaluation_results(self, filepath: str) -> Dict[str, Any]:
         """Загрузка результатов оценки"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
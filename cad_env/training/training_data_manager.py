@@ -2,14 +2,48 @@
 Менеджер данных для обучения
 """
 
-import json
 import logging
-from typing import Dict, Any, List, Optional
+import re
+from collections import Counter, defaultdict
+from itertools import chain, islice, zip_longest
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 from pathlib import Path
+import numpy as np
+from datasets import Dataset
 from ..code_generator import DatasetGenerator
 
 logger = logging.getLogger(__name__)
 
+# Синонимы для замены в описаниях
+_SYNONYMS = {
+    "создай": ("сделай", "построй", "добавь", "сгенерируй"),
+    "коробка": ("прямоугольник", "куб", "параллелепипед"),
+    "цилиндр": ("труба", "вал"),
+    "сфера": ("шар",),
+    "поверни": ("поворот", "вращение"),
+    "перемести": ("сдвинь", "передвинь"),
+    "размером": ("размерами", "с размерами")
+}
+# Все заменяемые слова: одним проходом по описанию находятся встречающиеся в нем
+_RE_SYNONYM = re.compile("|".join(map(re.escape, _SYNONYMS)))
+# Максимальное число вариаций одного описания
+_MAX_VARIATIONS = 3
+
+
+def _iter_dataset_file(filepath: str, mtime_ns: int) -> Iterator[Dict[str, Any]]:
+    """
+    Генератор образцов файла для Dataset.from_generator
+    
+    Args:
+        filepath: Путь к файлу датасета
+        mtime_ns: Время изменения файла; входит в отпечаток кэша datasets,
+            чтобы измененный файл не читался из устаревшего кэша
+            
+    Returns:
+        Итератор по образцам
+    """
+    yield from DatasetGenerator().iter_dataset(filepath)
+
 
 class TrainingDataManager:
     """
@@ -55,7 +89,7 @@ class TrainingDataManager:
         all_samples = basic_samples + complex_scenarios + validation_samples
         
         if save_to_file:
-            self._save_dataset(all_samples, "training_dataset.json")
+            self._save_dataset(all_samples, "training_dataset.jsonl")
         
         logger.info(f"Сгенерировано {len(all_samples)} образцов")
         return all_samples
@@ -71,7 +105,7 @@ class TrainingDataManager:
             Валидационный датасет
         """
         validation_samples = self.dataset_generator.generate_validation_dataset(num_samples)
-        self._save_dataset(validation_samples, "validation_dataset.json")
+        self._save_dataset(validation_samples, "validation_dataset.jsonl")
         return validation_samples
     
     def load_dataset(self, filename: str) -> List[Dict[str, Any]]:
@@ -84,21 +118,44 @@ class TrainingDataManager:
         Returns:
             Загруженный датасет
         """
+        filepath = self._dataset_path(filename)
+        return self.dataset_generator.load_dataset(str(filepath))
+    
+    def load_arrow_dataset(self, filename: str) -> Dataset:
+        """
+        Загрузка датасета в формат Arrow без чтения всех образцов в память
+        
+        Образцы читаются из файла потоково и записываются в кэш datasets,
+        который отображается в память; результат можно передать напрямую
+        в LLMTrainer.prepare_training_data.
+        
+        Args:
+            filename: Имя файла
+            
+        Returns:
+            Датасет Arrow
+        """
+        filepath = self._dataset_path(filename)
+        return Dataset.from_generator(
+            _iter_dataset_file,
+            gen_kwargs={"filepath": str(filepath), "mtime_ns": filepath.stat().st_mtime_ns}
+        )
+    
+    def _dataset_path(self, filename: str) -> Path:
+        """Путь к существующему файлу датасета"""
         filepath = self.data_dir / filename
         
         if not filepath.exists():
             raise FileNotFoundError(f"Файл {filepath} не найден")
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return data.get("samples", [])
+        return filepath
     
     def split_dataset(self, 
                      dataset: List[Dict[str, Any]], 
                      train_ratio: float = 0.8,
                      val_ratio: float = 0.1,
-                     test_ratio: float = 0.1) -> Dict[str, List[Dict[str, Any]]]:
+                     test_ratio: float = 0.1,
+                     seed: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Разделение датасета на train/val/test
         
@@ -107,23 +164,21 @@ class TrainingDataManager:
             train_ratio: Доля обучающих данных
             val_ratio: Доля валидационных данных
             test_ratio: Доля тестовых данных
+            seed: Зерно перемешивания для воспроизводимого разделения
             
         Returns:
             Разделенный датасет
         """
-        import random
-        
-        # Перемешивание данных
-        shuffled_data = dataset.copy()
-        random.shuffle(shuffled_data)
-        
-        total_samples = len(shuffled_data)
+        total_samples = len(dataset)
         train_size = int(total_samples * train_ratio)
         val_size = int(total_samples * val_ratio)
         
-        train_data = shuffled_data[:train_size]
-        val_data = shuffled_data[train_size:train_size + val_size]
-        test_data = shuffled_data[train_size + val_size:]
+        # Перемешиваются индексы, а не сами образцы
+        indices = np.random.default_rng(seed).permutation(total_samples).tolist()
+        
+        train_data = [dataset[i] for i in indices[:train_size]]
+        val_data = [dataset[i] for i in indices[train_size:train_size + val_size]]
+        test_data = [dataset[i] for i in indices[train_size + val_size:]]
         
         return {
             "train": train_data,
@@ -141,71 +196,80 @@ class TrainingDataManager:
         Returns:
             Аугментированный датасет
         """
-        augmented_samples = []
+        return list(self.iter_augment_dataset(dataset))
+    
+    def iter_augment_dataset(self, dataset: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Потоковая аугментация датасета
+        
+        Образцы выдаются по одному, поэтому аугментированный датасет можно
+        записать в файл, не собирая его в памяти (см. augment_and_save).
+        
+        Args:
+            dataset: Исходные образцы
+            
+        Returns:
+            Итератор по исходным и аугментированным образцам
+        """
+        total_samples = 0
+        augmented_count = 0
+        
+        # Повторные вариации берутся из ограниченного кэша генератора кода
+        generate = self.dataset_generator.code_generator.generate_from_natural_language
         
         for sample in dataset:
-            # Добавляем оригинальный образец
-            augmented_samples.append(sample)
+            # Выдаем оригинальный образец
+            total_samples += 1
+            augmented_count += 1
+            yield sample
             
             # Создаем вариации описания
             variations = self._create_description_variations(sample["description"])
             
             for variation in variations:
                 # Генерируем код для вариации
-                result = self.dataset_generator.code_generator.generate_from_natural_language(variation)
+                result = generate(variation)
                 
                 if result["success"]:
                     augmented_sample = sample.copy()
                     augmented_sample["description"] = variation
                     augmented_sample["generated_code"] = result["generated_code"]
-                    augmented_sample["id"] = f"{sample['id']}_aug_{len(augmented_samples)}"
-                    augmented_samples.append(augmented_sample)
+                    augmented_sample["id"] = f"{sample['id']}_aug_{augmented_count}"
+                    augmented_count += 1
+                    yield augmented_sample
         
-        logger.info(f"Аугментация: {len(dataset)} -> {len(augmented_samples)} образцов")
-        return augmented_samples
+        logger.info("Аугментация: %d -> %d образцов", total_samples, augmented_count)
+    
+    def augment_and_save(self, dataset: Iterable[Dict[str, Any]], filename: str = "augmented_dataset.jsonl"):
+        """
+        Аугментация датасета с потоковой записью в файл JSONL
+        
+        Args:
+            dataset: Исходные образцы
+            filename: Имя файла в директории данных
+        """
+        self._save_dataset(self.iter_augment_dataset(dataset), filename)
     
     def _create_description_variations(self, description: str) -> List[str]:
         """Создание вариаций описания"""
-        variations = []
-        
-        # Синонимы для замены
-        synonyms = {
-            "создай": ["сделай", "построй", "добавь", "сгенерируй"],
-            "коробка": ["прямоугольник", "куб", "параллелепипед"],
-            "цилиндр": ["труба", "вал"],
-            "сфера": ["шар"],
-            "поверни": ["поворот", "вращение"],
-            "перемести": ["сдвинь", "передвинь"],
-            "размером": ["размерами", "с размерами"]
-        }
-        
-        # Создаем вариации с заменой слов
-        for original, replacements in synonyms.items():
-            if original in description.lower():
-                for replacement in replacements:
-                    variation = description.lower().replace(original, replacement)
-                    if variation != description.lower():
-                        variations.append(variation)
-        
-        return variations[:3]  # Ограничиваем количество вариаций
+        lower = description.lower()
+        found = {match.group() for match in _RE_SYNONYM.finditer(lower)}
+        if not found:
+            return []
+        
+        # Каждая вариация заменяет одно слово; слова перебираются в порядке
+        # словаря синонимов, генерация останавливается на нужном числе вариаций
+        variations = (
+            lower.replace(original, replacement)
+            for original, replacements in _SYNONYMS.items()
+            if original in found
+            for replacement in replacements
+        )
+        return list(islice(variations, _MAX_VARIATIONS))
     
-    def _save_dataset(self, dataset: List[Dict[str, Any]], filename: str):
-        """Сохранение датасета в файл"""
-        filepath = self.data_dir / filename
-        
-        data = {
-            "metadata": {
-                "total_samples": len(dataset),
-                "generated_at": str(Path().cwd()),
-                "version": "1.0"
-            },
-            "samples": dataset
-        }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Датасет сохранен: {filepath}")
+    def _save_dataset(self, dataset: Iterable[Dict[str, Any]], filename: str):
+        """Сохранение датасета в файл формата JSONL (строка метаданных и по образцу на строку)"""
+        self.dataset_generator.save_dataset(dataset, str(self.data_dir / filename))
     
     def get_dataset_statistics(self, dataset: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -221,33 +285,30 @@ class TrainingDataManager:
             return {"error": "Пустой датасет"}
         
         # Подсчет по категориям
-        categories = {}
-        complexities = {}
-        
-        for sample in dataset:
-            category = sample.get("category", "unknown")
-            complexity = sample.get("complexity", "unknown")
-            
-            categories[category] = categories.get(category, 0) + 1
-            complexities[complexity] = complexities.get(complexity, 0) + 1
+        categories = Counter(sample.get("category", "unknown") for sample in dataset)
+        complexities = Counter(sample.get("complexity", "unknown") for sample in dataset)
         
-        # Анализ длины описаний
-        description_lengths = [len(sample["description"]) for sample in dataset]
-        code_lengths = [len(sample.get("generated_code", "")) for sample in dataset]
+        # Анализ длины описаний; длины собираются сразу в массивы numpy
+        description_lengths = np.fromiter(
+            (len(sample["description"]) for sample in dataset), dtype=np.int64, count=len(dataset)
+        )
+        code_lengths = np.fromiter(
+            (len(sample.get("generated_code", "")) for sample in dataset), dtype=np.int64, count=len(dataset)
+        )
         
         return {
             "total_samples": len(dataset),
-            "categories": categories,
-            "complexities": complexities,
+            "categories": dict(categories),
+            "complexities": dict(complexities),
             "description_length": {
-                "min": min(description_lengths),
-                "max": max(description_lengths),
-                "avg": sum(description_lengths) / len(description_lengths)
+                "min": int(description_lengths.min()),
+                "max": int(description_lengths.max()),
+                "avg": float(description_lengths.mean())
             },
             "code_length": {
-                "min": min(code_lengths),
-                "max": max(code_lengths),
-                "avg": sum(code_lengths) / len(code_lengths)
+                "min": int(code_lengths.min()),
+                "max": int(code_lengths.max()),
+                "avg": float(code_lengths.mean())
             }
         }
     
@@ -265,29 +326,12 @@ class TrainingDataManager:
             Сбалансированный датасет
         """
         # Группировка по категориям
-        categories = {}
+        categories = defaultdict(list)
         for sample in base_dataset:
-            category = sample.get("category", "unknown")
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(sample)
-        
-        # Расчет количества образцов на категорию
-        samples_per_category = target_size // len(categories)
-        
-        balanced_dataset = []
-        for category, samples in categories.items():
-            # Берем нужное количество образцов из каждой категории
-            selected_samples = samples[:samples_per_category]
-            balanced_dataset.extend(selected_samples)
-        
-        # Если не хватает образцов, добавляем из самых больших категорий
-        while len(balanced_dataset) < target_size:
-            for category, samples in categories.items():
-                if len(balanced_dataset) >= target_size:
-                    break
-                if len(samples) > samples_per_category:
-                    balanced_dataset.append(samples[samples_per_category])
-                    samples_per_category += 1
-        
-        return balanced_dataset[:target_size]
+            categories[sample.get("category", "unknown")].append(sample)
+        
+        # Образцы берутся по кругу - по одному из каждой категории, пока они есть,
+        # поэтому малые категории исчерпываются первыми, а остаток добирается из больших
+        missing = object()
+        round_robin = chain.from_iterable(zip_longest(*categories.values(), fillvalue=missing))
+        return list(islice((sample for sample in round_robin if sample is not missing), target_size))
@@ -2,19 +2,40 @@
 Базовые примеры использования CAD Environment
 """
 
+import functools
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cad_env import CADEnvironment, LLMInterface
 
+# Команды на естественном языке для демонстрации LLM интерфейса
+NATURAL_COMMANDS = (
+    "Создай коробку размером 10x5x3",
+    "Создай цилиндр радиусом 5 и высотой 10",
+    "Поверни на 90 градусов вокруг оси Z",
+    "Перемести на 10 единиц по оси X",
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _env() -> CADEnvironment:
+    """Окружение, общее для всех примеров модуля"""
+    return CADEnvironment()
+
+
+@functools.lru_cache(maxsize=1)
+def _llm() -> LLMInterface:
+    """LLM интерфейс над общим окружением"""
+    return LLMInterface(_env())
+
 
 def basic_cad_operations():
     """Базовые операции с CAD"""
     print("=== Базовые операции с CAD ===")
     
     # Создание окружения
-    env = CADEnvironment()
+    env = _env()
     
     # Создание документа
     doc_id = env.create_document("TestDocument")
@@ -32,9 +53,8 @@ def basic_cad_operations():
     success = env.save_document("test_document.fcstd")
     print(f"Документ сохранен: {success}")
     
-    # Получение истории операций
-    history = env.get_history()
-    print(f"История операций: {len(history)} записей")
+    # Число операций в истории
+    print(f"История операций: {env.get_history_count()} записей")
 
 
 def llm_interface_example():
@@ -42,19 +62,13 @@ def llm_interface_example():
     print("\n=== LLM интерфейс ===")
     
     # Создание LLM интерфейса
-    llm = LLMInterface()
+    llm = _llm()
     
-    # Обработка естественного языка
-    natural_commands = [
-        "Создай коробку размером 10x5x3",
-        "Создай цилиндр радиусом 5 и высотой 10",
-        "Поверни на 90 градусов вокруг оси Z",
-        "Перемести на 10 единиц по оси X"
-    ]
+    # Обработка естественного языка: команды разбираются и выполняются одним пакетом
+    results = llm.process_natural_language_batch(list(NATURAL_COMMANDS))
     
-    for command in natural_commands:
+    for command, result in zip(NATURAL_COMMANDS, results):
         print(f"\nКоманда: {command}")
-        result = llm.process_natural_language(command)
         print(f"Результат: {result}")
     
     # Получение доступных команд
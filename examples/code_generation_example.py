@@ -2,30 +2,37 @@
 Пример генерации FreeCAD Python кода
 """
 
+import functools
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cad_env.code_generator import FreeCADCodeGenerator, CodeExecutor
 
+# Примеры описаний
+DESCRIPTIONS = (
+    "Создай коробку размером 20x15x10",
+    "Создай цилиндр радиусом 5 и высотой 15",
+    "Создай сферу радиусом 8",
+    "Поверни объект на 90 градусов вокруг оси Z",
+    "Перемести объект на 10 единиц по оси X",
+    "Выдави объект на 5 единиц",
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _generator() -> FreeCADCodeGenerator:
+    """Генератор кода, общий для всех примеров модуля"""
+    return FreeCADCodeGenerator()
+
 
 def basic_code_generation():
     """Базовые примеры генерации кода"""
     print("=== Генерация FreeCAD Python кода ===")
     
-    generator = FreeCADCodeGenerator()
-    
-    # Примеры описаний
-    descriptions = [
-        "Создай коробку размером 20x15x10",
-        "Создай цилиндр радиусом 5 и высотой 15",
-        "Создай сферу радиусом 8",
-        "Поверни объект на 90 градусов вокруг оси Z",
-        "Перемести объект на 10 единиц по оси X",
-        "Выдави объект на 5 единиц"
-    ]
+    generator = _generator()
     
-    for description in descriptions:
+    for description in DESCRIPTIONS:
         print(f"\nОписание: {description}")
         result = generator.generate_from_natural_language(description)
         
@@ -40,7 +47,7 @@ def complex_script_generation():
     """Генерация сложного скрипта"""
     print("\n=== Генерация сложного скрипта ===")
     
-    generator = FreeCADCodeGenerator()
+    generator = _generator()
     
     # Сложный сценарий
     scenario = [
@@ -71,7 +78,7 @@ def code_execution_demo():
     print("\n=== Выполнение сгенерированного кода ===")
     
     executor = CodeExecutor()
-    generator = FreeCADCodeGenerator()
+    generator = _generator()
     
     # Генерируем простой код
     description = "Создай коробку размером 10x5x3"
@@ -101,7 +108,7 @@ def structured_request_demo():
     """Демонстрация структурированных запросов"""
     print("\n=== Структурированные запросы ===")
     
-    generator = FreeCADCodeGenerator()
+    generator = _generator()
     
     # Структурированные запросы
     requests = [
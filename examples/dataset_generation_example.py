@@ -2,25 +2,38 @@
 Пример генерации датасетов для обучения
 """
 
+import argparse
+import functools
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cad_env.code_generator import DatasetGenerator
 from cad_env.training import TrainingDataManager
-import json
 
 
-def generate_training_dataset():
+@functools.lru_cache(maxsize=1)
+def _generator() -> DatasetGenerator:
+    """Генератор датасетов, общий для всех примеров модуля"""
+    return DatasetGenerator()
+
+
+@functools.lru_cache(maxsize=1)
+def _data_manager() -> TrainingDataManager:
+    """Менеджер данных обучения, общий для всех примеров модуля"""
+    return TrainingDataManager("./training_data")
+
+
+def generate_training_dataset(workers: int = 1):
     """Генерация датасета для обучения"""
     print("=== Генерация датасета для обучения ===")
     
-    generator = DatasetGenerator()
-    data_manager = TrainingDataManager("./training_data")
+    generator = _generator()
+    data_manager = _data_manager()
     
     # Генерация базового датасета
     print("Генерация базового датасета...")
-    basic_dataset = generator.generate_training_dataset(num_samples=100)
+    basic_dataset = generator.generate_training_dataset(num_samples=100, num_proc=workers)
     
     print(f"Сгенерировано {len(basic_dataset)} базовых образцов")
     
@@ -41,7 +54,7 @@ def generate_complex_scenarios():
     """Генерация сложных сценариев"""
     print("\n=== Генерация сложных сценариев ===")
     
-    generator = DatasetGenerator()
+    generator = _generator()
     
     # Генерация сложных сценариев
     scenarios = generator.generate_complex_scenarios(num_scenarios=5)
@@ -67,7 +80,7 @@ def dataset_statistics():
     """Анализ статистики датасета"""
     print("\n=== Статистика датасета ===")
     
-    data_manager = TrainingDataManager("./training_data")
+    data_manager = _data_manager()
     
     # Генерация датасета
     dataset = data_manager.generate_training_dataset(num_samples=200)
@@ -86,7 +99,7 @@ def dataset_augmentation():
     """Аугментация датасета"""
     print("\n=== Аугментация датасета ===")
     
-    data_manager = TrainingDataManager("./training_data")
+    data_manager = _data_manager()
     
     # Создаем небольшой базовый датасет
     base_dataset = [
@@ -117,7 +130,7 @@ def create_balanced_dataset():
     """Создание сбалансированного датасета"""
     print("\n=== Создание сбалансированного датасета ===")
     
-    data_manager = TrainingDataManager("./training_data")
+    data_manager = _data_manager()
     
     # Генерируем базовый датасет
     base_dataset = data_manager.generate_training_dataset(num_samples=100)
@@ -138,13 +151,13 @@ def save_and_load_dataset():
     """Сохранение и загрузка датасета"""
     print("\n=== Сохранение и загрузка датасета ===")
     
-    generator = DatasetGenerator()
+    generator = _generator()
     
     # Генерация датасета
     dataset = generator.generate_training_dataset(num_samples=50)
     
     # Сохранение
-    filepath = "example_dataset.json"
+    filepath = "example_dataset.jsonl"
     generator.save_dataset(dataset, filepath)
     print(f"Датасет сохранен в {filepath}")
     
@@ -160,8 +173,13 @@ def save_and_load_dataset():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Число процессов генерации обучающего датасета")
+    args = parser.parse_args()
+    
     try:
-        generate_training_dataset()
+        generate_training_dataset(args.workers)
         generate_complex_scenarios()
         dataset_statistics()
         dataset_augmentation()
@@ -35,18 +35,43 @@ class CADAgent:
         
         # Обрабатываем через LLM интерфейс
         result = self.llm_interface.process_natural_language(user_input)
+        response = self._format_response(result)
         
-        # Формируем ответ
+        # Добавляем ответ в историю
+        self.conversation_history.append({"role": "assistant", "content": response})
+        
+        return response
+    
+    def process_user_inputs(self, user_inputs: list) -> list:
+        """
+        Обработать несколько пользовательских вводов одним пакетом
+        
+        Args:
+            user_inputs: Вводы пользователя
+            
+        Returns:
+            Ответы агента в порядке вводов
+        """
+        results = self.llm_interface.process_natural_language_batch(user_inputs)
+        
+        responses = []
+        for user_input, result in zip(user_inputs, results):
+            response = self._format_response(result)
+            self.conversation_history.append({"role": "user", "content": user_input})
+            self.conversation_history.append({"role": "assistant", "content": response})
+            responses.append(response)
+        
+        return responses
+    
+    @staticmethod
+    def _format_response(result: dict) -> str:
+        """Сформировать ответ агента по результату обработки"""
         if result["success"]:
             response = f"✅ Выполнено: {result['message']}"
             if result.get("result"):
                 response += f"\nРезультат: {result['result']}"
         else:
             response = f"❌ Ошибка: {result.get('message', 'Неизвестная ошибка')}"
-        
-        # Добавляем ответ в историю
-        self.conversation_history.append({"role": "assistant", "content": response})
-        
         return response
     
     def get_suggestions(self, partial_input: str = "") -> list:
@@ -167,9 +192,11 @@ def batch_demo():
     print("Выполнение демонстрационных команд:")
     print("-" * 40)
     
-    for i, command in enumerate(demo_commands, 1):
+    # Команды разбираются одним проходом и выполняются одной транзакцией
+    responses = agent.process_user_inputs(demo_commands)
+    
+    for i, (command, response) in enumerate(zip(demo_commands, responses), 1):
         print(f"\n{i}. {command}")
-        response = agent.process_user_input(command)
         print(f"   {response}")
     
     # Показываем контекст
@@ -2,13 +2,13 @@
 Пример обучения LLM для работы с FreeCAD
 """
 
+import argparse
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cad_env.training import LLMTrainer, TrainingDataManager
-from cad_env.code_generator import DatasetGenerator
-import torch
 
 
 def prepare_training_data():
@@ -31,7 +31,7 @@ def prepare_training_data():
     return split_data
 
 
-def setup_model():
+def setup_model(quantization: str = "none"):
     """Настройка модели"""
     print("\n=== Настройка модели ===")
     
@@ -41,7 +41,7 @@ def setup_model():
     trainer = LLMTrainer(model_name=model_name)
     
     try:
-        trainer.setup_model()
+        trainer.setup_model(quantization=quantization)
         print(f"✅ Модель {model_name} настроена успешно")
         return trainer
     except Exception as e:
@@ -123,15 +123,18 @@ def test_model_generation(trainer):
     ]
     
     print("Тестирование генерации кода:")
-    for i, description in enumerate(test_descriptions, 1):
+    try:
+        # Все описания генерируются одним батчем: запросы проходят через модель
+        # одним прямым проходом, а не по одному на описание
+        generated_codes = trainer.generate_batch(test_descriptions, max_length=200)
+    except Exception as e:
+        print(f"❌ Ошибка генерации: {e}")
+        return
+    
+    for i, (description, generated_code) in enumerate(zip(test_descriptions, generated_codes), 1):
         print(f"\n{i}. Описание: {description}")
-        
-        try:
-            generated_code = trainer.generate_code(description, max_length=200)
-            print(f"Сгенерированный код:")
-            print(generated_code)
-        except Exception as e:
-            print(f"❌ Ошибка генерации: {e}")
+        print(f"Сгенерированный код:")
+        print(generated_code)
 
 
 def evaluate_model(trainer, test_data):
@@ -162,15 +165,15 @@ def evaluate_model(trainer, test_data):
         print(f"❌ Ошибка оценки: {e}")
 
 
-def demonstrate_training_pipeline():
+def demonstrate_training_pipeline(quantization: str = "none"):
     """Демонстрация полного пайплайна обучения"""
     print("=== Полный пайплайн обучения LLM для FreeCAD ===")
     
-    # 1. Подготовка данных
-    split_data = prepare_training_data()
-    
-    # 2. Настройка модели
-    trainer = setup_model()
+    # 1-2. Подготовка данных в фоновом потоке, пока загружается модель
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        split_data_future = executor.submit(prepare_training_data)
+        trainer = setup_model(quantization)
+        split_data = split_data_future.result()
     
     # 3. Подготовка датасетов
     train_dataset, val_dataset = prepare_datasets(trainer, split_data)
@@ -220,8 +223,13 @@ def demonstrate_code_generation_without_training():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quant", choices=["none", "int8", "int4"], default="none",
+                        help="Квантование весов модели (int8/int4 требуют bitsandbytes и peft)")
+    args = parser.parse_args()
+    
     try:
-        demonstrate_training_pipeline()
+        demonstrate_training_pipeline(args.quant)
         demonstrate_code_generation_without_training()
         print("\n=== Все примеры обучения выполнены успешно! ===")
     except Exception as e:
@@ -15,6 +15,9 @@ def main():
     parser = argparse.ArgumentParser(description="CAD Environment Web Server")
     parser.add_argument("--host", default="127.0.0.1", help="Хост для сервера")
     parser.add_argument("--port", type=int, default=8000, help="Порт для сервера")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Количество процессов (каждый процесс со своим окружением CAD)")
+    parser.add_argument("--no-access-log", action="store_true", help="Не журналировать каждый запрос")
     parser.add_argument("--debug", action="store_true", help="Режим отладки")
     
     args = parser.parse_args()
@@ -28,7 +31,8 @@ def main():
     
     try:
         # Создание и запуск веб-сервера
-        server = WebServer(host=args.host, port=args.port)
+        server = WebServer(host=args.host, port=args.port, workers=args.workers,
+                           access_log=not args.no_access_log)
         server.run()
     except KeyboardInterrupt:
         print("\nСервер остановлен")
@@ -16,6 +16,7 @@ setup(
     long_description_content_type="text/markdown",
     url="",
     packages=find_packages(),
+    package_data={"cad_env.api": ["static/*"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -32,6 +33,7 @@ setup(
     extras_require={
         "dev": [
             "pytest>=7.0.0",
+            "pytest-xdist>=3.0.0",
             "black>=22.0.0",
             "flake8>=4.0.0",
             "mypy>=0.950",
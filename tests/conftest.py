@@ -0,0 +1,64 @@
+"""
+Общие фикстуры тестов
+"""
+
+import pytest
+
+from cad_env import CADEnvironment, LLMInterface
+from cad_env.code_generator.code_templates import _format_template
+from cad_env.llm_interface import NaturalLanguageProcessor
+from cad_env.llm_interface.command_parser import _parse_command
+from cad_env.llm_interface.natural_language_processor import _analyze_intent
+
+# Кэши результатов разбора текста уровня модуля; проверка наличия FreeCAD
+# (_load_freecad, _freecad_available) не сбрасывается - она не зависит от теста
+_RESULT_CACHES = (_parse_command, _analyze_intent, _format_template)
+
+
+@pytest.fixture(autouse=True)
+def clear_result_caches():
+    """Сброс кэшей после теста, чтобы следующий тест не получал чужие результаты"""
+    yield
+    for cache in _RESULT_CACHES:
+        cache.cache_clear()
+
+
+@pytest.fixture(scope="module")
+def shared_env():
+    """Окружение, общее для всех тестов модуля"""
+    return CADEnvironment()
+
+
+@pytest.fixture
+def env(shared_env):
+    """Окружение, сброшенное перед тестом"""
+    shared_env.reset()
+    return shared_env
+
+
+@pytest.fixture
+def env_with_document(env):
+    """Сброшенное окружение с активным документом TestDoc"""
+    env.create_document("TestDoc")
+    return env
+
+
+@pytest.fixture(scope="session")
+def nlp():
+    """Обработчик естественного языка, общий для всех тестов: он не хранит состояния"""
+    return NaturalLanguageProcessor()
+
+
+@pytest.fixture(scope="session")
+def shared_llm(nlp):
+    """LLM интерфейс, общий для всех тестов, с общим обработчиком языка"""
+    llm = LLMInterface()
+    llm.nlp = nlp
+    return llm
+
+
+@pytest.fixture
+def llm(shared_llm):
+    """LLM интерфейс с окружением, сброшенным перед тестом"""
+    shared_llm.env.reset()
+    return shared_llm
@@ -4,56 +4,62 @@
 
 import pytest
 from fastapi.testclient import TestClient
-from cad_env.api import CADAPI
+from cad_env.api import CADAPI, WebServer
+
+
+@pytest.fixture(scope="module")
+def api():
+    """API, общий для всех тестов модуля"""
+    return CADAPI()
+
+
+@pytest.fixture(scope="module")
+def shared_client(api):
+    """Тестовый клиент, общий для всех тестов модуля"""
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def client(api, shared_client):
+    """Тестовый клиент с окружением, сброшенным перед тестом"""
+    api.env.reset()
+    return shared_client
 
 
 class TestCADAPI:
     """Тесты для CADAPI"""
     
-    def test_initialization(self):
+    def test_initialization(self, api):
         """Тест инициализации API"""
-        api = CADAPI()
         assert api is not None
         assert api.app is not None
         assert api.env is not None
     
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Тест корневого эндпоинта"""
-        api = CADAPI()
-        client = TestClient(api.app)
-        
         response = client.get("/")
         assert response.status_code == 200
         data = response.json()
         assert "message" in data
         assert "version" in data
     
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Тест проверки состояния"""
-        api = CADAPI()
-        client = TestClient(api.app)
-        
         response = client.get("/health")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
     
-    def test_create_document(self):
+    def test_create_document(self, client):
         """Тест создания документа"""
-        api = CADAPI()
-        client = TestClient(api.app)
-        
         response = client.post("/documents/create", json={"name": "TestDoc"})
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert "document_id" in data
     
-    def test_execute_command(self):
+    def test_execute_command(self, client):
         """Тест выполнения команды"""
-        api = CADAPI()
-        client = TestClient(api.app)
-        
         # Сначала создаем документ
         client.post("/documents/create", json={"name": "TestDoc"})
         
@@ -66,3 +72,59 @@ class TestCADAPI:
         data = response.json()
         assert data["success"] is True
 
+    
+    def test_execute_command_invalid_request(self, client):
+        """Тест выполнения команды с некорректным запросом"""
+        response = client.post("/commands/execute", json={"parameters": {}})
+        assert response.status_code == 422
+    
+    def test_openapi_request_bodies(self, client):
+        """Тест описания тел запросов в схеме OpenAPI"""
+        paths = client.get("/openapi.json").json()["paths"]
+        
+        schema = paths["/commands/execute"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+        assert schema["required"] == ["command"]
+        for route in ("create", "load", "save"):
+            schema = paths["/documents/" + route]["post"]["requestBody"]["content"]["application/json"]["schema"]
+            assert set(schema["properties"]) == {"name", "filepath"}
+    
+    def test_get_history(self, client):
+        """Тест получения истории операций"""
+        client.post("/documents/create", json={"name": "TestDoc"})
+        
+        response = client.get("/history")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        data = response.json()
+        assert data["success"] is True
+        assert len(data["history"]) == 1
+        
+        response = client.get("/history/count")
+        assert response.status_code == 200
+        assert response.json() == {"success": True, "count": 1}
+    
+    def test_response_compression(self, client):
+        """Тест сжатия больших ответов"""
+        client.post("/documents/create", json={"name": "TestDoc"})
+        for _ in range(20):
+            client.post("/commands/execute", json={"command": "create_box", "parameters": {}})
+        
+        response = client.get("/history", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["history"]) == 21
+
+
+class TestWebServer:
+    """Тесты для WebServer"""
+    
+    def test_web_interface(self):
+        """Тест отдачи веб-интерфейса"""
+        server = WebServer()
+        client = TestClient(server.app)
+        
+        response = client.get("/web/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert response.headers["content-encoding"] == "gzip"
+        assert "CAD Environment" in response.text
@@ -0,0 +1,324 @@
+"""
+Тесты для генератора FreeCAD кода
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+
+from cad_env.code_generator import CodeExecutor, DatasetGenerator, FreeCADCodeGenerator
+from cad_env.code_generator.freecad_worker import read_frame, write_frame
+
+
+BOX_CODE = """# Создание коробки
+box = doc.addObject("Part::Box", "Box_10x5x3")
+box.Length = 10
+doc.recompute()"""
+
+
+class TestCodeExecutor:
+    """Тесты для CodeExecutor"""
+    
+    def test_simulate_execution(self):
+        """Тест симуляции выполнения кода"""
+        executor = CodeExecutor()
+        
+        result = executor._execute_simulation(BOX_CODE)
+        assert result["success"] is True
+        assert result["objects_created"] == [{"type": "Part::Box", "name": "Box_10x5x3"}]
+        assert result["operations_performed"] == ["recompute"]
+    
+    def test_execution_cache(self):
+        """Тест кэширования результатов выполнения"""
+        executor = CodeExecutor()
+        
+        first = executor.execute_code(BOX_CODE)
+        first["objects_created"].clear()
+        
+        second = executor.execute_code(BOX_CODE)
+        assert second["execution_time"] == 0
+        assert second["objects_created"] == [{"type": "Part::Box", "name": "Box_10x5x3"}]
+    
+    def test_execute_code_async(self):
+        """Тест асинхронного выполнения кода"""
+        executor = CodeExecutor()
+        
+        result = asyncio.run(executor.execute_code_async(BOX_CODE))
+        assert result["success"] is True
+        assert result["objects_created"] == [{"type": "Part::Box", "name": "Box_10x5x3"}]
+    
+    def test_execute_code_async_concurrent(self):
+        """Тест одновременного выполнения одинакового кода"""
+        executor = CodeExecutor()
+        
+        async def run_all():
+            return await asyncio.gather(*(executor.execute_code_async(BOX_CODE) for _ in range(3)))
+        
+        results = asyncio.run(run_all())
+        assert all(result["objects_created"] == results[0]["objects_created"] for result in results)
+        assert len({id(result) for result in results}) == 3
+        assert not executor._inflight
+    
+    def test_execution_history(self, tmp_path):
+        """Тест ограниченной истории выполнения с архивом"""
+        archive = tmp_path / "history.jsonl"
+        executor = CodeExecutor(history_size=2, history_archive=str(archive))
+        
+        for i in range(3):
+            executor.save_execution_result({"success": True, "output": str(i)})
+        
+        assert [r["output"] for r in executor.get_execution_history()] == ["1", "2"]
+        # Архив дописывается пачками, остаток - при close
+        assert not archive.exists()
+        
+        executor.close()
+        assert len(archive.read_text(encoding="utf-8").splitlines()) == 3
+    
+    def test_iter_history_snapshot(self):
+        """Тест итерации по истории во время записи новых результатов"""
+        executor = CodeExecutor(history_size=10)
+        executor.save_execution_result({"success": True, "output": "0"})
+        
+        outputs = []
+        for result in executor.iter_history():
+            executor.save_execution_result({"success": True, "output": "1"})
+            outputs.append(result["output"])
+        
+        assert outputs == ["0"]
+        assert len(executor.get_execution_history()) == 2
+    
+    def test_validate_code(self):
+        """Тест валидации кода"""
+        executor = CodeExecutor()
+        
+        result = executor.validate_code(BOX_CODE)
+        assert result["valid"] is True
+        assert sorted(result["freecad_calls"]) == ["addObject", "recompute"]
+        assert result["complexity"]["comment_lines"] == 1
+    
+    def test_validate_invalid_code(self):
+        """Тест валидации некорректного кода"""
+        executor = CodeExecutor()
+        
+        result = executor.validate_code("box = doc.addObject(")
+        assert result["valid"] is False
+        assert result["syntax_errors"]
+
+    
+    def test_worker_frames(self):
+        """Тест обмена сообщениями с процессом FreeCAD"""
+        stream = io.BytesIO()
+        write_frame(stream, BOX_CODE.encode("utf-8"))
+        write_frame(stream, b"")
+        
+        # Посторонний вывод FreeCAD перед сообщением пропускается
+        stream = io.BytesIO(b"FreeCAD banner\n" + stream.getvalue())
+        assert read_frame(stream).decode("utf-8") == BOX_CODE
+        assert read_frame(stream) == b""
+        assert read_frame(stream) is None
+
+
+
+class TestFreeCADCodeGenerator:
+    """Тесты для FreeCADCodeGenerator"""
+    
+    def test_generation_cache(self):
+        """Тест кэширования генерации по описанию"""
+        generator = FreeCADCodeGenerator()
+        description = "Создай цилиндр радиусом 5 и высотой 10"
+        
+        first = generator.generate_from_natural_language(description)
+        first["parameters"]["radius"] = 0
+        
+        second = generator.generate_from_natural_language(description)
+        assert second["parameters"] == {"radius": 5.0, "height": 10.0}
+        assert second["generated_code"] == first["generated_code"]
+        assert len(generator.get_generation_history()) == 2
+    
+    def test_structured_request_cache(self):
+        """Тест кэширования генерации по структурированному запросу"""
+        generator = FreeCADCodeGenerator()
+        request = {"action": "create_sphere", "parameters": {"radius": 3}}
+        
+        first = generator.generate_from_structured_request(request)
+        second = generator.generate_from_structured_request(request)
+        assert second["generated_code"] == first["generated_code"]
+        assert second["parameters"] is request["parameters"]
+        assert len(generator._structured_cache) == 1
+        
+        # Запрос с нехэшируемыми параметрами выполняется без кэша
+        unhashable = generator.generate_from_structured_request(
+            {"action": "custom", "parameters": {"points": [1, 2]}}
+        )
+        assert unhashable["success"] is True
+        assert len(generator._structured_cache) == 1
+    
+    def test_structured_request_cache_typed(self):
+        """Тест различения int и float в ключе кэша"""
+        generator = FreeCADCodeGenerator()
+        
+        as_int = generator.generate_from_structured_request(
+            {"action": "create_box", "parameters": {"length": 10, "width": 10, "height": 10}}
+        )
+        as_float = generator.generate_from_structured_request(
+            {"action": "create_box", "parameters": {"length": 10.0, "width": 10, "height": 10}}
+        )
+        uncached = FreeCADCodeGenerator(cache_size=0).generate_from_structured_request(
+            {"action": "create_box", "parameters": {"length": 10.0, "width": 10, "height": 10}}
+        )
+        assert as_float["generated_code"] != as_int["generated_code"]
+        assert as_float["generated_code"] == uncached["generated_code"]
+    
+    def test_generation_history_disabled(self):
+        """Тест отключения истории генерации"""
+        generator = FreeCADCodeGenerator(enable_history=False)
+        generator.generate_from_natural_language("Создай сферу радиусом 5")
+        
+        assert generator.get_generation_history() == []
+
+
+class TestDatasetGenerator:
+    """Тесты для DatasetGenerator"""
+    
+    def test_generate_training_dataset(self):
+        """Тест генерации обучающего датасета"""
+        generator = DatasetGenerator(seed=0)
+        samples = generator.generate_training_dataset(num_samples=50)
+        
+        assert len(samples) == 50
+        for sample in samples:
+            assert sample["generated_code"]
+            assert sample["category"] in ("creation", "transformation", "boolean", "other")
+            for value in sample["parameters"].values():
+                assert type(value) in (int, float, str)
+    
+    def test_generate_training_dataset_seed(self):
+        """Тест воспроизводимости датасета при фиксированном зерне"""
+        first = DatasetGenerator(seed=42).generate_training_dataset(num_samples=20)
+        second = DatasetGenerator(seed=42).generate_training_dataset(num_samples=20)
+        
+        assert [s["description"] for s in first] == [s["description"] for s in second]
+    
+    @pytest.mark.slow
+    def test_generate_training_dataset_parallel(self):
+        """Тест параллельной генерации датасета"""
+        serial = DatasetGenerator(seed=7).generate_training_dataset(num_samples=20)
+        parallel = DatasetGenerator(seed=7).generate_training_dataset(num_samples=20, num_proc=2)
+        
+        assert parallel == serial
+    
+    def test_save_and_load_dataset(self, tmp_path):
+        """Тест сохранения и загрузки датасета в формате JSONL"""
+        generator = DatasetGenerator(seed=0)
+        samples = generator.generate_training_dataset(num_samples=10)
+        filepath = tmp_path / "dataset.jsonl"
+        
+        generator.save_dataset(samples, str(filepath))
+        
+        assert len(filepath.read_text(encoding="utf-8").splitlines()) == 11
+        assert generator.load_dataset(str(filepath)) == samples
+        assert next(generator.iter_dataset(str(filepath))) == samples[0]
+    
+    def test_save_and_load_compressed_dataset(self, tmp_path):
+        """Тест сохранения и загрузки датасета, сжатого zstandard"""
+        pytest.importorskip("zstandard")
+        generator = DatasetGenerator(seed=0)
+        samples = generator.generate_training_dataset(num_samples=10)
+        filepath = tmp_path / "dataset.jsonl.zst"
+        
+        generator.save_dataset(samples, str(filepath))
+        
+        assert not filepath.read_bytes().startswith(b"{")
+        assert generator.load_dataset(str(filepath)) == samples
+    
+    def test_save_and_load_dataset_binary(self, tmp_path):
+        """Тест сохранения и загрузки датасета в бинарном формате"""
+        generator = DatasetGenerator(seed=0)
+        samples = generator.generate_training_dataset(num_samples=10)
+        validation = generator.generate_validation_dataset(num_samples=4)
+        
+        generator.save_dataset_binary(samples, str(tmp_path / "dataset.bin"))
+        generator.save_dataset_binary(validation, str(tmp_path / "validation.bin"))
+        
+        assert generator.load_dataset_binary(str(tmp_path / "dataset.bin")) == samples
+        assert generator.load_dataset_binary(str(tmp_path / "dataset.bin"), indices=[7, 2]) == [samples[7], samples[2]]
+        assert generator.load_dataset_binary(str(tmp_path / "validation.bin")) == validation
+    
+    def test_iter_shuffled_batches(self, tmp_path):
+        """Тест чтения датасета перемешанными батчами"""
+        generator = DatasetGenerator(seed=0)
+        samples = generator.generate_training_dataset(num_samples=25)
+        filepath = tmp_path / "dataset.jsonl"
+        generator.save_dataset(samples, str(filepath))
+        
+        batches = list(generator.iter_shuffled_batches(str(filepath), batch_size=4, fetch_factor=2))
+        
+        assert [len(batch) for batch in batches] == [4, 4, 4, 4, 4, 4, 1]
+        # Перемешивание происходит только внутри блока из batch_size * fetch_factor образцов
+        assert sorted(s["id"] for s in batches[0] + batches[1]) == [s["id"] for s in samples[:8]]
+        assert sorted(s["id"] for batch in batches for s in batch) == [s["id"] for s in samples]
+    
+    def test_generate_training_dataset_reservoir(self):
+        """Тест генерации равномерной подвыборки датасета"""
+        generator = DatasetGenerator(seed=3)
+        samples = generator.generate_training_dataset(num_samples=100000, reservoir_size=10)
+        
+        ids = [sample["id"] for sample in samples]
+        assert len(samples) == 10
+        assert ids == sorted(set(ids))
+        assert not generator.generated_samples
+        
+        assert generator.generate_training_dataset(num_samples=100, reservoir_size=0) == []
+    
+    def test_track_history(self):
+        """Тест сохранения сгенерированных образцов"""
+        generator = DatasetGenerator(seed=0, track_history=True)
+        samples = generator.generate_training_dataset(num_samples=5)
+        
+        assert generator.generated_samples == samples
+    
+    def test_generate_complex_scenarios_seed(self):
+        """Тест воспроизводимости сценариев при фиксированном зерне"""
+        first = DatasetGenerator(seed=5).generate_complex_scenarios(num_scenarios=10)
+        second = DatasetGenerator(seed=5).generate_complex_scenarios(num_scenarios=10)
+        
+        assert [s["title"] for s in first] == [s["title"] for s in second]
+    
+    def test_generate_and_save(self, tmp_path):
+        """Тест потоковой генерации датасета в файл"""
+        filepath = tmp_path / "dataset.jsonl"
+        DatasetGenerator(seed=1).generate_and_save(str(filepath), num_samples=10)
+        
+        expected = DatasetGenerator(seed=1).generate_training_dataset(num_samples=10)
+        assert DatasetGenerator().load_dataset(str(filepath)) == expected
+    
+    def test_load_legacy_json_dataset(self, tmp_path):
+        """Тест загрузки датасета в прежнем формате JSON"""
+        samples = DatasetGenerator(seed=0).generate_training_dataset(num_samples=5)
+        filepath = tmp_path / "dataset.json"
+        filepath.write_text(
+            json.dumps({"metadata": {"total_samples": 5}, "samples": samples}, ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        
+        assert DatasetGenerator().load_dataset(str(filepath)) == samples
+    
+    def test_load_legacy_compressed_json_dataset(self, tmp_path):
+        """Тест загрузки сжатого датасета в прежнем формате JSON"""
+        zstandard = pytest.importorskip("zstandard")
+        samples = DatasetGenerator(seed=0).generate_training_dataset(num_samples=5)
+        filepath = tmp_path / "dataset.json.zst"
+        document = json.dumps({"metadata": {"total_samples": 5}, "samples": samples}, ensure_ascii=False, indent=2)
+        filepath.write_bytes(zstandard.ZstdCompressor().compress(document.encode("utf-8")))
+        
+        assert DatasetGenerator().load_dataset(str(filepath)) == samples
+    
+    def test_generate_validation_dataset(self):
+        """Тест генерации валидационного датасета"""
+        generator = DatasetGenerator(seed=0)
+        samples = generator.generate_validation_dataset(num_samples=20)
+        
+        assert len(samples) == 20
+        assert len(generator.code_generator.get_generation_history()) == 4
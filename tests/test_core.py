@@ -3,70 +3,85 @@
 """
 
 import pytest
-import tempfile
-import os
 from cad_env import CADEnvironment
 
 
 class TestCADEnvironment:
     """Тесты для CADEnvironment"""
     
-    def test_initialization(self):
+    def test_initialization(self, env):
         """Тест инициализации"""
-        env = CADEnvironment()
         assert env is not None
         assert env.current_document is None
-        assert env.history == []
+        assert env.get_history_count() == 0
     
-    def test_create_document(self):
+    def test_create_document(self, env):
         """Тест создания документа"""
-        env = CADEnvironment()
         doc_id = env.create_document("TestDoc")
         assert doc_id is not None
         assert env.current_document == doc_id
-        assert len(env.history) == 1
+        assert env.get_history_count() == 1
     
-    def test_save_document(self):
+    def test_save_document(self, env_with_document, tmp_path):
         """Тест сохранения документа"""
-        env = CADEnvironment()
-        env.create_document("TestDoc")
-        
-        with tempfile.NamedTemporaryFile(suffix='.fcstd', delete=False) as tmp:
-            filepath = tmp.name
+        filepath = tmp_path / "TestDoc.fcstd"
         
-        try:
-            success = env.save_document(filepath)
-            assert success
-            assert os.path.exists(filepath)
-        finally:
-            if os.path.exists(filepath):
-                os.unlink(filepath)
+        assert env_with_document.save_document(str(filepath))
+        assert filepath.exists()
     
-    def test_execute_command(self):
+    @pytest.mark.parametrize("command,parameters", [
+        ("create_box", {"length": 10, "width": 5, "height": 3}),
+        ("create_cylinder", {"radius": 5, "height": 10}),
+        ("rotate", {"angle": 90, "axis": "Z"}),
+    ], ids=["box", "cylinder", "rotate"])
+    def test_execute_command(self, env_with_document, command, parameters):
         """Тест выполнения команды"""
-        env = CADEnvironment()
-        env.create_document("TestDoc")
+        env = env_with_document
         
-        result = env.execute_command("create_box", length=10, width=5, height=3)
-        assert result is not None
-        assert len(env.history) == 2  # create_document + execute_command
+        result = env.execute_command(command, **parameters)
+        assert result["success"] is True
+        assert env.get_history_count() == 2  # create_document + execute_command
+        assert env.history[-1]["command"] == command
     
-    def test_get_document_info(self):
+    def test_execute_commands(self, env_with_document):
+        """Тест пакетного выполнения команд"""
+        env = env_with_document
+        
+        results = env.execute_commands([("create_box", {"length": 1}), ("create_sphere", {"radius": 2})])
+        assert [r["success"] for r in results] == [True, True]
+        assert [h["command"] for h in env.get_history()[1:]] == ["create_box", "create_sphere"]
+        assert env.get_history_count() == 3
+    
+    def test_get_document_info(self, env_with_document):
         """Тест получения информации о документе"""
-        env = CADEnvironment()
-        env.create_document("TestDoc")
+        info = env_with_document.get_document_info()
+        assert info["name"] == "TestDoc"
+        assert info["count"] == 0
+    
+    def test_document_name(self, env):
+        """Тест получения имени текущего документа"""
+        assert env.document_name() is None
         
-        info = env.get_document_info()
-        assert info is not None
-        assert "name" in info or "error" in info
+        env.create_document("TestDoc")
+        assert env.document_name() == "TestDoc"
     
-    def test_reset(self):
+    def test_reset(self, env_with_document):
         """Тест сброса окружения"""
-        env = CADEnvironment()
-        env.create_document("TestDoc")
+        env = env_with_document
         env.execute_command("create_box", length=1, width=1, height=1)
         
         env.reset()
         assert env.current_document is None
-        assert env.history == []
-
+        assert env.get_history_count() == 0
+    
+    def test_history_config(self):
+        """Тест ограничения и отключения истории операций"""
+        env = CADEnvironment({"history_max": 2})
+        env.create_document("TestDoc")
+        for size in (1, 2, 3):
+            env.execute_command("create_box", length=size, width=1, height=1)
+        assert [h["kwargs"]["length"] for h in env.get_history()] == [2, 3]
+        
+        env = CADEnvironment({"enable_history": False})
+        env.create_document("TestDoc")
+        assert env.get_history_count() == 0
@@ -3,32 +3,49 @@
 """
 
 import pytest
-from cad_env import LLMInterface
+from cad_env.llm_interface import CommandParser
 
 
 class TestLLMInterface:
     """Тесты для LLMInterface"""
     
-    def test_initialization(self):
+    def test_initialization(self, llm):
         """Тест инициализации"""
-        llm = LLMInterface()
         assert llm is not None
         assert llm.env is not None
         assert llm.command_parser is not None
         assert llm.nlp is not None
     
-    def test_process_natural_language(self):
+    @pytest.mark.parametrize("text,action", [
+        ("Создай коробку размером 10x5x3", "create_box"),
+        ("Создай сферу радиусом 5", "create_sphere"),
+        ("Поверни на 90 градусов вокруг оси Z", "rotate"),
+        ("create box 1x1x1", None),
+    ], ids=["box", "sphere", "rotate", "unknown"])
+    def test_process_natural_language(self, llm, text, action):
         """Тест обработки естественного языка"""
-        llm = LLMInterface()
+        result = llm.process_natural_language(text)
+        assert result["success"] is (action is not None)
+        if action:
+            assert result["command"]["action"] == action
+    
+    def test_process_natural_language_batch(self, llm):
+        """Тест пакетной обработки естественного языка"""
+        llm.env.create_document("TestDoc")
         
-        # Тест создания коробки
-        result = llm.process_natural_language("Создай коробку размером 10x5x3")
-        assert result is not None
-        assert "success" in result
+        results = llm.process_natural_language_batch([
+            "Создай коробку размером 10x5x3",
+            "Привет",
+            "Поверни на 90 градусов",
+        ])
+        
+        assert [r["success"] for r in results] == [True, False, True]
+        assert results[0]["command"]["action"] == "create_box"
+        assert results[2]["result"]["success"] is True
+        assert llm.env.get_history_count() == 3
     
-    def test_get_available_commands(self):
+    def test_get_available_commands(self, llm):
         """Тест получения доступных команд"""
-        llm = LLMInterface()
         commands = llm.get_available_commands()
         
         assert isinstance(commands, list)
@@ -40,20 +57,28 @@ class TestLLMInterface:
             assert "description" in cmd
             assert "parameters" in cmd
             assert "example" in cmd
+            assert isinstance(cmd["parameters"], list)
+        
+        # Изменение результата не затрагивает следующие вызовы
+        commands[0]["parameters"].append("extra")
+        commands[0]["command"] = "changed"
+        assert llm.get_available_commands()[0] == {
+            "command": "create_box",
+            "description": "Создать прямоугольный параллелепипед",
+            "parameters": ["length", "width", "height"],
+            "example": "Создай коробку размером 10x5x3"
+        }
     
-    def test_get_context_info(self):
+    def test_get_context_info(self, llm):
         """Тест получения контекстной информации"""
-        llm = LLMInterface()
         context = llm.get_context_info()
         
         assert isinstance(context, dict)
         assert "environment_status" in context
         assert "available_commands" in context
     
-    def test_execute_structured_command(self):
+    def test_execute_structured_command(self, llm):
         """Тест выполнения структурированной команды"""
-        llm = LLMInterface()
-        
         command = {
             "action": "create_box",
             "parameters": {"length": 10, "width": 5, "height": 3}
@@ -63,3 +88,120 @@ class TestLLMInterface:
         assert result is not None
         assert "success" in result
 
+
+class TestCommandParser:
+    """Тесты для CommandParser"""
+    
+    def test_parse_create_box(self):
+        """Тест разбора команды создания коробки"""
+        command = CommandParser().parse_natural_language("Создай коробку размером 10x5x3", "create_object")
+        assert command["action"] == "create_box"
+        assert command["parameters"] == {"length": 10.0, "width": 5.0, "height": 3.0}
+        assert command["original_text"] == "Создай коробку размером 10x5x3"
+    
+    def test_parse_case_insensitive(self):
+        """Тест разбора текста в верхнем регистре"""
+        command = CommandParser().parse_natural_language("СОЗДАЙ КУБ РАЗМЕРОМ 2X3X4", "create_object")
+        assert command["parameters"] == {"length": 2.0, "width": 3.0, "height": 4.0}
+    
+    def test_parse_create_cylinder(self):
+        """Тест разбора радиуса и высоты цилиндра в любом порядке"""
+        command = CommandParser().parse_natural_language("Создай цилиндр высотой 10 и радиусом 2", "create_object")
+        assert list(command["parameters"].items()) == [("radius", 2.0), ("height", 10.0)]
+    
+    def test_parse_rotate(self):
+        """Тест разбора команды поворота"""
+        command = CommandParser().parse_natural_language("Поверни на 45 градусов вокруг оси X", "transform_object")
+        assert command["action"] == "rotate"
+        assert command["parameters"] == {"angle": 45.0, "axis": "X"}
+    
+    def test_parse_alternative_patterns(self):
+        """Тест разбора альтернативных формулировок команд"""
+        parser = CommandParser()
+        
+        command = parser.parse_natural_language("Поворот на 15 градусов", "transform_object")
+        assert command["parameters"] == {"angle": 15.0, "axis": "Z"}
+        
+        command = parser.parse_natural_language("Сдвинь на 5 единиц по оси Y", "transform_object")
+        assert command["action"] == "translate"
+        assert command["parameters"] == {"y": 5.0}
+    
+    def test_parse_cache(self):
+        """Тест кэширования разбора команд"""
+        parser = CommandParser()
+        parser.cache_clear()
+        
+        first = parser.parse_natural_language("Создай сферу радиусом 3", "create_object")
+        first["parameters"]["radius"] = 0
+        second = parser.parse_natural_language("  Создай сферу радиусом 3 ", "create_object")
+        
+        assert second["parameters"] == {"radius": 3.0}
+        assert parser.cache_info().hits == 1
+    
+    def test_parse_unknown(self):
+        """Тест текста без команды"""
+        assert CommandParser().parse_natural_language("Привет", "unknown") is None
+    
+    def test_validate_command(self):
+        """Тест проверки обязательных параметров команды"""
+        parser = CommandParser()
+        
+        assert parser.validate_command({"action": "create_sphere", "parameters": {"radius": 1}})
+        assert not parser.validate_command({"action": "create_box", "parameters": {"length": 1}})
+        assert parser.validate_command({"action": "translate", "parameters": {"y": 2}})
+        assert not parser.validate_command({"action": "translate", "parameters": {}})
+        assert parser.validate_command({"action": "union"})
+        assert not parser.validate_command({})
+    
+    def test_slots(self):
+        """Тест отсутствия словаря атрибутов у парсера"""
+        parser = CommandParser()
+        
+        assert not hasattr(parser, "__dict__")
+        assert parser.parse_natural_language("Создай сферу радиусом 2", "create_sphere")
+
+
+class TestNaturalLanguageProcessor:
+    """Тесты для NaturalLanguageProcessor"""
+    
+    def test_analyze_intent(self, nlp):
+        """Тест определения намерения"""
+        assert nlp.analyze_intent("Создай цилиндр") == "create_object"
+        assert nlp.analyze_intent("Сохрани документ") == "file_operation"
+        assert nlp.analyze_intent("Привет") == "unknown"
+        # Порядок намерений задает приоритет, а не позиция в тексте
+        assert nlp.analyze_intent("Покажи и создай куб") == "create_object"
+    
+    def test_extract_entities(self, nlp):
+        """Тест извлечения сущностей"""
+        entities = nlp.extract_entities("Цилиндр высотой 2 см, X=5, 30 градусов")
+        assert entities["object_types"] == ["цилиндр"]
+        assert entities["measurements"] == [20.0, 5.0, 30.0]
+        assert entities["coordinates"] == [{"axis": "X", "value": 5.0}]
+        assert entities["angles"] == [30.0]
+    
+    def test_extract_coordinates(self, nlp):
+        """Тест извлечения нескольких координат подряд"""
+        assert nlp.extract_entities("x: 1 y=2 z = 3")["coordinates"] == [
+            {"axis": "X", "value": 1.0},
+            {"axis": "Y", "value": 2.0},
+            {"axis": "Z", "value": 3.0},
+        ]
+        
+        # Префикс координаты после числа не принимается за единицу измерения
+        entities = nlp.extract_entities("коробка 10 y: 3 z=4")
+        assert entities["coordinates"] == [{"axis": "Y", "value": 3.0}, {"axis": "Z", "value": 4.0}]
+        assert entities["measurements"] == [10.0, 3.0, 4.0]
+        assert nlp.extract_entities("box1 x=5")["coordinates"] == [{"axis": "X", "value": 5.0}]
+    
+    def test_validate_text(self, nlp):
+        """Тест проверки текста"""
+        assert nlp.validate_text("Создай цилиндр радиусом 5")["warnings"] == []
+        assert nlp.validate_text("Привет")["warnings"] == ["Не найдено командных слов"]
+        assert nlp.validate_text("")["valid"] is False
+    
+    def test_get_suggestions(self, nlp):
+        """Тест предложений для автодополнения"""
+        assert len(nlp.get_suggestions("")) == 3
+        assert nlp.get_suggestions("Поворот")[0] == "поверни на 90 градусов вокруг оси Z"
+        assert nlp.get_suggestions("удали") == []